@@ -0,0 +1,45 @@
+from dateutil.relativedelta import relativedelta
+import numpy as np
+
+CHUNK_MONTHS = 120
+
+
+def _balances_before(principal, r, installment, months):
+    """Closed-form outstanding balance before each payment number in ``months``."""
+    if r == 0:
+        return principal - installment * (months - 1)
+    growth = (1 + r) ** (months - 1)
+    return principal * growth - installment * (growth - 1) / r
+
+
+def schedule_rows(loan, first_month=1, last_month=None):
+    """Yield the amortization rows for months ``first_month..last_month`` of ``loan``.
+
+    Balances come from the annuity closed form, so a window starts without replaying
+    earlier months, and rows are computed ``CHUNK_MONTHS`` at a time with NumPy.
+    """
+    tenure = loan.tenure
+    last_month = last_month or tenure
+    r = loan.interest_rate / (12 * 100)
+    installment = loan.monthly_installment
+
+    for chunk_start in range(first_month, last_month + 1, CHUNK_MONTHS):
+        months = np.arange(chunk_start, min(chunk_start + CHUNK_MONTHS, last_month + 1))
+        opening = np.maximum(_balances_before(loan.loan_amount, r, installment, months), 0)
+        interest = opening * r
+        principal = np.minimum(installment - interest, opening)
+        # The final payment settles whatever the rounded installment left over
+        principal[months == tenure] = opening[months == tenure]
+        closing = opening - principal
+
+        for month, interest_paid, principal_paid, balance in zip(
+            months.tolist(), interest.tolist(), principal.tolist(), closing.tolist()
+        ):
+            yield {
+                "month": month,
+                "due_date": (loan.start_date + relativedelta(months=month)).isoformat(),
+                "payment": round(interest_paid + principal_paid, 2),
+                "principal": round(principal_paid, 2),
+                "interest": round(interest_paid, 2),
+                "balance": round(balance, 2)
+            }
@@ -0,0 +1,75 @@
+"""Move matured loans out of the hot ``Loan`` table.
+
+A loan is archived once it has ended and started before the current year, so it
+only feeds the credit score through its count, on-time flag and amount. Those are
+folded into ``LoanHistory`` in the same transaction that moves the row, which keeps
+credit profiles valid without a rebuild.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+
+from .models import Customer, Loan, LoanArchive, LoanHistory
+
+LOAN_FIELDS = [field.attname for field in Loan._meta.concrete_fields]
+
+
+def archive_matured_loans(batch_size=5000, today=None):
+    """Archive matured loans in keyset batches and return how many were moved."""
+    today = today or date.today()
+    matured = Loan.objects.filter(end_date__lt=today, start_date__lt=date(today.year, 1, 1))
+
+    archived = 0
+    last_id = 0
+    while True:
+        candidates = list(
+            matured.filter(id__gt=last_id).order_by('id').values_list('id', 'customer_id')[:batch_size]
+        )
+        if not candidates:
+            break
+        last_id = candidates[-1][0]
+        customer_ids = sorted({customer_id for _, customer_id in candidates})
+
+        with transaction.atomic():
+            # The lock loan creation and profile rebuilds take, so neither sees a half-moved batch
+            list(
+                Customer.objects.select_for_update()
+                .filter(id__in=customer_ids)
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+            loans = list(matured.filter(id__in=[loan_id for loan_id, _ in candidates]))
+            if not loans:
+                continue
+
+            LoanArchive.objects.bulk_create([
+                LoanArchive(**{field: getattr(loan, field) for field in LOAN_FIELDS}) for loan in loans
+            ])
+
+            histories = LoanHistory.objects.in_bulk(customer_ids)
+            for loan in loans:
+                history = histories.setdefault(loan.customer_id, LoanHistory(customer_id=loan.customer_id))
+                history.total_loans += 1
+                history.on_time_loans += loan.emis_paid_on_time
+                history.approved_volume += loan.loan_amount
+            LoanHistory.objects.bulk_create(
+                histories.values(),
+                update_conflicts=True,
+                unique_fields=['customer'],
+                update_fields=LoanHistory.COUNTER_FIELDS,
+            )
+
+            # A plain DELETE: QuerySet.delete() would fetch every row to send Loan's delete
+            # signals, and their invalidation is not needed as cached details stay valid
+            # and views fall back to the archive
+            loan_ids = [loan.id for loan in loans]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {connection.ops.quote_name(Loan._meta.db_table)} "
+                    f"WHERE {connection.ops.quote_name(Loan._meta.pk.column)} "
+                    f"IN ({', '.join(['%s'] * len(loan_ids))})",
+                    loan_ids,
+                )
+
+        archived += len(loans)
+    return archived
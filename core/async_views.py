@@ -0,0 +1,157 @@
+import json
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import Throttled
+import orjson
+
+from .caching import CUSTOMER_LOANS_KEY, LOAN_DETAIL_KEY, aget_or_build, timeout_until_midnight
+from .models import Customer, Loan, LoanArchive
+from .ratelimit import bucket_for, retry_after, take_token
+from .routers import areplica_reads
+from .rules import aactive_rules
+from .scoring import aget_credit_profiles
+from .views import ViewCustomerLoansView, eligibility_result, loan_detail, loan_summary
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncCheckEligibilityView(View):
+    async def post(self, request):
+        try:
+            data = _request_data(request)
+        except ValueError:
+            return JsonResponse({"error": "Malformed JSON body."}, status=400)
+        if not isinstance(data, dict):
+            return JsonResponse({"error": "Expected a JSON object."}, status=400)
+
+        customer_id = data.get('customer_id')
+        loan_amount = data.get('loan_amount')
+        interest_rate = data.get('interest_rate')
+        tenure = data.get('tenure')
+
+        bucket = bucket_for(request, customer_id)
+        if bucket is not None:
+            key, limit = bucket
+            wait = await sync_to_async(take_token)(key, limit['burst'], limit['per_second'])
+            if wait is not None:
+                response = JsonResponse({"detail": str(Throttled(wait).detail)}, status=429)
+                response['Retry-After'] = retry_after(wait)
+                return response
+
+        if not all([customer_id, loan_amount, interest_rate, tenure]):
+            return JsonResponse({"error": "All fields are required."}, status=400)
+
+        async with areplica_reads(customer_id):
+            customer = await Customer.objects.select_related('credit_profile').filter(id=customer_id).afirst()
+            if customer is None:
+                return JsonResponse({"error": "Customer not found."}, status=404)
+
+            aggregates = (await aget_credit_profiles([customer]))[customer.id].as_aggregates()
+        result, status_code = eligibility_result(
+            customer, aggregates, loan_amount, interest_rate, tenure, await aactive_rules()
+        )
+        return JsonResponse(result, status=status_code)
+
+
+class AsyncViewLoanDetail(View):
+    async def get(self, request, loan_id):
+        async with areplica_reads():
+            loan_data = await aget_or_build(
+                LOAN_DETAIL_KEY.format(loan_id), lambda: self.build_loan_data(loan_id)
+            )
+        if loan_data is None:
+            # A loan created moments ago may not have reached the replica yet
+            loan_data = await aget_or_build(
+                LOAN_DETAIL_KEY.format(loan_id), lambda: self.build_loan_data(loan_id)
+            )
+        if loan_data is None:
+            return JsonResponse({"error": "Loan not found."}, status=404)
+
+        return JsonResponse(loan_data, status=200)
+
+    @staticmethod
+    async def build_loan_data(loan_id):
+        for model in (Loan, LoanArchive):
+            loan = await model.objects.select_related('customer').filter(id=loan_id).afirst()
+            if loan is not None:
+                return loan_detail(loan)
+        return None
+
+
+class AsyncViewCustomerLoansView(View):
+    async def get(self, request, customer_id):
+        async with areplica_reads(customer_id):
+            return await self.read_loans(request.GET, customer_id)
+
+    async def read_loans(self, params, customer_id):
+        if params.get('stream') == 'true':
+            return await self.stream_loans(customer_id)
+        if 'limit' in params or 'cursor' in params:
+            return await self.paginate_loans(customer_id, params)
+
+        loan_data = await aget_or_build(
+            CUSTOMER_LOANS_KEY.format(customer_id),
+            lambda: self.build_loan_data(customer_id),
+            timeout=timeout_until_midnight(),
+        )
+        if loan_data is None:
+            return JsonResponse({"error": "Customer not found."}, status=404)
+
+        return JsonResponse(loan_data, status=200, safe=False)
+
+    @staticmethod
+    async def build_loan_data(customer_id):
+        if not await Customer.objects.filter(id=customer_id).aexists():
+            return None
+
+        today = datetime.now().date()
+        loans = ViewCustomerLoansView.active_loans(customer_id, today)
+        return [loan_summary(loan, today) async for loan in loans]
+
+    async def paginate_loans(self, customer_id, params):
+        try:
+            limit, cursor = ViewCustomerLoansView.page_params(params)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        if not await Customer.objects.filter(id=customer_id).aexists():
+            return JsonResponse({"error": "Customer not found."}, status=404)
+
+        today = datetime.now().date()
+        loans = ViewCustomerLoansView.active_loans(customer_id, today).filter(id__gt=cursor)
+        loans = [loan async for loan in loans[:limit + 1]]
+        has_more = len(loans) > limit
+        loans = loans[:limit]
+
+        return JsonResponse({
+            "results": [loan_summary(loan, today) for loan in loans],
+            "next_cursor": loans[-1].id if has_more else None
+        }, status=200)
+
+    async def stream_loans(self, customer_id):
+        if not await Customer.objects.filter(id=customer_id).aexists():
+            return JsonResponse({"error": "Customer not found."}, status=404)
+
+        today = datetime.now().date()
+        loans = ViewCustomerLoansView.active_loans(customer_id, today)
+        loans = loans.using(loans.db).aiterator(chunk_size=ViewCustomerLoansView.stream_chunk_size)
+
+        async def render():
+            yield '['
+            first = True
+            async for loan in loans:
+                yield (b'' if first else b',') + orjson.dumps(loan_summary(loan, today))
+                first = False
+            yield ']'
+
+        return StreamingHttpResponse(render(), content_type='application/json')
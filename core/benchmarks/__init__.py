@@ -0,0 +1,18 @@
+"""Benchmarks run through ``manage.py benchmark <name>`` against a throwaway database."""
+from . import (
+    async_reads,
+    eligibility_batch,
+    endpoints,
+    explain_indexes,
+    loan_contention,
+    render_view_loans,
+)
+
+BENCHMARKS = {
+    'async-reads': async_reads,
+    'eligibility-batch': eligibility_batch,
+    'endpoints': endpoints,
+    'explain-indexes': explain_indexes,
+    'loan-contention': loan_contention,
+    'render-view-loans': render_view_loans,
+}
@@ -0,0 +1,86 @@
+"""Compare sync views under WSGI with async views under ASGI at the same concurrency.
+
+Both runs use the in-process test handlers: threads driving ``Client`` for WSGI and
+an event loop driving ``AsyncClient`` for ASGI.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db import connections
+from django.test import AsyncClient, override_settings
+
+from core.models import Loan
+
+from .driver import send, timed_request
+from .seed import seed_dataset
+
+
+def add_arguments(parser):
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+
+
+def _workload(customer_ids, loan_ids, count):
+    rng = random.Random(0)
+    work = []
+    for _ in range(count):
+        kind = rng.choice(['view-loan', 'view-loans', 'check-eligibility'])
+        if kind == 'view-loan':
+            work.append(('get', f'/view-loan/{rng.choice(loan_ids)}', None))
+        elif kind == 'view-loans':
+            work.append(('get', f'/view-loans/{rng.choice(customer_ids)}', None))
+        else:
+            work.append(('post', '/check-eligibility', {
+                'customer_id': rng.choice(customer_ids),
+                'loan_amount': rng.randrange(10000, 500000, 1000),
+                'interest_rate': rng.choice([8, 12, 16]),
+                'tenure': rng.choice([12, 24, 36]),
+            }))
+    return work
+
+
+def _run_sync(work, concurrency):
+    started = time.perf_counter()
+    with override_settings(ROOT_URLCONF='core.urls'):
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(timed_request, work))
+    return time.perf_counter() - started
+
+
+def _run_async(work, concurrency):
+    async def drive():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(request):
+            async with semaphore:
+                await send(client, *request)
+
+        await asyncio.gather(*(call(request) for request in work))
+        # The async ORM ran its queries on a worker thread that still holds a connection
+        await sync_to_async(connections.close_all)()
+
+    started = time.perf_counter()
+    with override_settings(ROOT_URLCONF='core.urls_async'):
+        asyncio.run(drive())
+    return time.perf_counter() - started
+
+
+def run(options):
+    customer_ids = seed_dataset(options['customers'], options['loans_per_customer'])
+    loan_ids = list(Loan.objects.values_list('id', flat=True))
+    work = _workload(customer_ids, loan_ids, options['requests'])
+
+    results = {'requests': len(work), 'concurrency': options['concurrency']}
+    for label, runner in [('sync_wsgi', _run_sync), ('async_asgi', _run_async)]:
+        cache.clear()
+        elapsed = runner(work, options['concurrency'])
+        results[label] = {
+            'seconds': round(elapsed, 3),
+            'requests_per_second': round(len(work) / elapsed, 1),
+        }
+    return results
@@ -0,0 +1,34 @@
+import time
+
+from django.db import connection, connections
+from django.test import Client
+
+
+def send(client, method, url, data=None):
+    if method == 'post':
+        return client.post(url, data, content_type='application/json')
+    return client.get(url)
+
+
+def timed_request(request):
+    """Send ``(method, url, data)`` from a fresh client on the calling thread.
+
+    Returns ``(status_code, seconds, query_count)``; a status of ``None`` means the
+    request raised.
+    """
+    queries = 0
+
+    def count_queries(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(count_queries):
+            status = send(Client(), *request).status_code
+    except Exception:
+        status = None
+    finally:
+        connections.close_all()
+    return status, time.perf_counter() - started, queries
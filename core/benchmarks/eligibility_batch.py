@@ -0,0 +1,42 @@
+"""Compare N single ``check-eligibility`` calls with one ``check-eligibility/batch`` call."""
+import random
+import time
+
+from django.test import Client
+
+from .seed import seed_dataset
+
+
+def add_arguments(parser):
+    parser.add_argument('--requests', type=int, default=500, help="Offers to evaluate")
+
+
+def run(options):
+    customer_ids = seed_dataset(options['customers'], options['loans_per_customer'])
+    rng = random.Random(0)
+    offers = [
+        {
+            'customer_id': rng.choice(customer_ids),
+            'loan_amount': rng.randrange(10000, 500000, 1000),
+            'interest_rate': rng.choice([8, 11, 12, 14, 17]),
+            'tenure': rng.choice([6, 12, 24, 36]),
+        }
+        for _ in range(options['requests'])
+    ]
+    client = Client()
+
+    started = time.perf_counter()
+    for offer in offers:
+        client.post('/check-eligibility', offer, content_type='application/json')
+    single_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    client.post('/check-eligibility/batch', offers, content_type='application/json')
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        'requests': len(offers),
+        'single_seconds': round(single_seconds, 4),
+        'batch_seconds': round(batch_seconds, 4),
+        'speedup': round(single_seconds / batch_seconds, 1),
+    }
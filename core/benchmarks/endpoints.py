@@ -0,0 +1,142 @@
+"""Load-test every API endpoint: throughput, latency percentiles and queries per request.
+
+Write endpoints (register, create-loan) need PostgreSQL for ``--concurrency`` above 1;
+SQLite's in-memory test database rejects concurrent writers.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import itertools
+import json
+import random
+import time
+
+from django.core.cache import cache
+from django.db.models import Count
+import numpy as np
+
+from core.models import Loan
+
+from .driver import timed_request
+from .seed import seed_dataset
+
+ENDPOINTS = ['register', 'check-eligibility', 'create-loan', 'view-loan', 'view-loans']
+
+
+def add_arguments(parser):
+    parser.add_argument('--requests', type=int, default=500, help="Requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument(
+        '--skew', type=float, default=1.5,
+        help="Pareto shape for loans per customer; 0 gives every customer the same count",
+    )
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--baseline', help="Earlier results JSON to check for regressions")
+    parser.add_argument(
+        '--tolerance', type=float, default=0.2,
+        help="Allowed relative p95 growth over the baseline (default: 0.2)",
+    )
+
+
+class RequestFactory:
+    def __init__(self, customer_ids, weights, loan_ids, seed=0):
+        self.rng = random.Random(seed)
+        self.customer_ids = customer_ids
+        self.weights = weights
+        self.loan_ids = loan_ids
+        self.phone_numbers = itertools.count(8000000000)
+
+    def customer_id(self):
+        # Customers with longer histories get proportionally more traffic
+        return self.rng.choices(self.customer_ids, self.weights)[0]
+
+    def loan_terms(self):
+        return {
+            'customer_id': self.customer_id(),
+            'loan_amount': self.rng.randrange(10000, 500000, 1000),
+            'interest_rate': self.rng.choice([8, 12, 16]),
+            'tenure': self.rng.choice([12, 24, 36]),
+        }
+
+    def build(self, endpoint):
+        if endpoint == 'register':
+            return ('post', '/register', {
+                'first_name': 'Load',
+                'last_name': 'Test',
+                'age': self.rng.randint(21, 65),
+                'monthly_income': self.rng.randrange(20000, 300000, 1000),
+                'phone_number': next(self.phone_numbers),
+            })
+        if endpoint == 'check-eligibility':
+            return ('post', '/check-eligibility', self.loan_terms())
+        if endpoint == 'create-loan':
+            return ('post', '/create-loan', self.loan_terms())
+        if endpoint == 'view-loan':
+            return ('get', f'/view-loan/{self.rng.choice(self.loan_ids)}', None)
+        return ('get', f'/view-loans/{self.customer_id()}', None)
+
+
+def summarize(results, elapsed):
+    statuses = [status for status, _, _ in results]
+    latencies_ms = np.array([seconds for _, seconds, _ in results]) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+
+    return {
+        'requests': len(results),
+        'errors': sum(1 for status in statuses if status is None or status >= 500),
+        'requests_per_second': round(len(results) / elapsed, 1),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+        'queries_per_request': round(sum(queries for _, _, queries in results) / len(results), 2),
+    }
+
+
+def find_regressions(endpoints, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = json.load(f).get('endpoints', {})
+
+    regressions = {}
+    for name, current in endpoints.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions[name] = {'p95_ms': [previous['p95_ms'], current['p95_ms']]}
+        if current['queries_per_request'] > previous['queries_per_request']:
+            regressions.setdefault(name, {})['queries_per_request'] = [
+                previous['queries_per_request'], current['queries_per_request'],
+            ]
+    return regressions
+
+
+def run(options):
+    customer_ids = seed_dataset(
+        options['customers'], options['loans_per_customer'], skew=options['skew']
+    )
+    loan_counts = dict(
+        Loan.objects.filter(customer_id__in=customer_ids)
+        .values_list('customer_id')
+        .annotate(count=Count('id'))
+    )
+    weights = [loan_counts.get(customer_id, 0) + 1 for customer_id in customer_ids]
+    loan_ids = list(Loan.objects.values_list('id', flat=True))
+    factory = RequestFactory(customer_ids, weights, loan_ids)
+
+    endpoints = {}
+    for endpoint in options['endpoints']:
+        work = [factory.build(endpoint) for _ in range(options['requests'])]
+        cache.clear()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(timed_request, work))
+        endpoints[endpoint] = summarize(results, time.perf_counter() - started)
+
+    results = {
+        'customers': len(customer_ids),
+        'loans': len(loan_ids),
+        'concurrency': options['concurrency'],
+        'endpoints': endpoints,
+    }
+    if options['baseline']:
+        results['regressions'] = find_regressions(endpoints, options['baseline'], options['tolerance'])
+    return results
@@ -0,0 +1,60 @@
+"""Seed a large loan table and check the planner picks the loan hot-path indexes."""
+from datetime import date
+import time
+
+from django.db import connection
+
+from core.models import Loan
+from core.scoring import _aggregate_expressions
+from core.views import ViewCustomerLoansView
+
+from .seed import seed_dataset
+
+
+def add_arguments(parser):
+    parser.add_argument('--probes', type=int, default=50, help="Customers to time each query on")
+
+
+def _analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def run(options):
+    customer_ids = seed_dataset(
+        options['customers'], options['loans_per_customer'], skew=1.5
+    )
+    _analyze()
+
+    today = date.today()
+    queries = {
+        'view-loans': lambda customer_id: ViewCustomerLoansView.active_loans(customer_id, today),
+        'view-loans-page': lambda customer_id: ViewCustomerLoansView.active_loans(
+            customer_id, today
+        ).filter(id__gt=0)[:ViewCustomerLoansView.max_page_size],
+        # The aggregate behind rebuild_credit_profiles
+        'profile-rebuild': lambda customer_id: Loan.objects.filter(
+            customer_id__in=[customer_id]
+        ).values('customer_id').annotate(**_aggregate_expressions(today)),
+        'current-year-loans': lambda customer_id: Loan.objects.filter(
+            customer_id=customer_id, start_date__year=today.year
+        ).values('loan_amount', 'emis_paid_on_time'),
+    }
+
+    results = {'loans': Loan.objects.count(), 'queries': {}}
+    for name, build in queries.items():
+        plan = build(customer_ids[0]).explain()
+
+        started = time.perf_counter()
+        for probe in customer_ids[:options['probes']]:
+            list(build(probe))
+        elapsed = time.perf_counter() - started
+
+        results['queries'][name] = {
+            'uses_index': any(
+                index.name in plan for index in Loan._meta.indexes
+            ),
+            'mean_ms': round(elapsed * 1000 / min(options['probes'], len(customer_ids)), 3),
+            'plan': plan.splitlines(),
+        }
+    return results
@@ -0,0 +1,70 @@
+"""Fire parallel ``create-loan`` calls at a few customers and check nothing is over-approved.
+
+Run it against PostgreSQL; SQLite's in-memory test database rejects concurrent writers.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import time
+
+from django.db.models import Q, Sum
+
+from core.models import Customer
+from core.outbox import process_outbox
+
+from .driver import timed_request
+from .seed import seed_dataset
+
+LOAN_AMOUNT = 100000
+
+
+def add_arguments(parser):
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests-per-customer', type=int, default=50)
+
+
+def _create_loan_request(customer_id):
+    return ('post', '/create-loan', {
+        'customer_id': customer_id,
+        'loan_amount': LOAN_AMOUNT,
+        'interest_rate': 16,
+        'tenure': 12,
+    })
+
+
+def run(options):
+    customer_ids = seed_dataset(options['customers'], options['loans_per_customer'])
+    work = customer_ids * options['requests_per_customer']
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+        results = list(pool.map(timed_request, map(_create_loan_request, work)))
+    elapsed = time.perf_counter() - started
+    # current_debt is brought up to date by the loan.created outbox handler
+    process_outbox()
+
+    statuses = [status for status, _, _ in results]
+    active = Q(loans__end_date__gte=date.today())
+    customers = Customer.objects.filter(id__in=customer_ids).annotate(
+        active_debt=Sum('loans__loan_amount', filter=active),
+    )
+    debt_mismatches = sum(
+        1 for customer in customers
+        if customer.current_debt != round(customer.active_debt or 0)
+    )
+    # The last approval may push debt over the limit, but never further
+    over_approved = sum(
+        1 for customer in customers
+        if (customer.active_debt or 0) - LOAN_AMOUNT > customer.approved_limit
+    )
+
+    return {
+        'threads': options['threads'],
+        'requests': len(work),
+        'approved': statuses.count(201),
+        'rejected': statuses.count(200),
+        'errors': len(statuses) - statuses.count(201) - statuses.count(200),
+        'requests_per_second': round(len(work) / elapsed, 1),
+        'debt_mismatches': debt_mismatches,
+        'over_approved_customers': over_approved,
+    }
+
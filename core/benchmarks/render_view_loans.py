@@ -0,0 +1,88 @@
+"""Render a large ``view-loans`` payload with DRF's JSONRenderer and with the orjson hot path."""
+from datetime import date
+import json
+import statistics
+import time
+
+from dateutil.relativedelta import relativedelta
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core.models import Customer, Loan
+from core.renderers import ORJSONRenderer
+from core.views import ViewCustomerLoansView
+
+
+class BaselineCustomerLoansView(ViewCustomerLoansView):
+    # The response path before the orjson renderer: negotiation over JSON and browsable API
+    renderer_classes = [JSONRenderer, BrowsableAPIRenderer]
+    content_negotiation_class = DefaultContentNegotiation
+
+
+def add_arguments(parser):
+    parser.add_argument('--loans', type=int, default=5000, help="Active loans in the payload")
+    parser.add_argument('--repeat', type=int, default=50)
+
+
+def _median_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def _seed_customer(loans):
+    customer = Customer.objects.create(
+        first_name='Render', last_name='Benchmark', age=40, phone_number=7000000000,
+        monthly_salary=10000000, approved_limit=360000000,
+    )
+    today = date.today()
+    Loan.objects.bulk_create(
+        Loan(
+            customer=customer,
+            loan_amount=100000 + index,
+            tenure=120,
+            interest_rate=10.5 + index % 7 / 4,
+            monthly_installment=(100000 + index) / 90.3,
+            emis_paid_on_time=True,
+            start_date=today - relativedelta(months=index % 60),
+            end_date=today + relativedelta(months=120 - index % 60),
+        )
+        for index in range(loans)
+    )
+    return customer.id
+
+
+def run(options):
+    customer_id = _seed_customer(options['loans'])
+    payload = ViewCustomerLoansView.build_loan_data(customer_id)
+    request = APIRequestFactory().get(f'/view-loans/{customer_id}', HTTP_ACCEPT='application/json')
+
+    def respond(view):
+        return view(request, customer_id=customer_id).render().content
+
+    baseline_view = BaselineCustomerLoansView.as_view()
+    lean_view = ViewCustomerLoansView.as_view()
+    # Fill the loan cache so both endpoints measure the response path, not the query
+    if json.loads(respond(baseline_view)) != json.loads(respond(lean_view)):
+        raise AssertionError("The renderers disagree on the view-loans payload")
+
+    results = {
+        'loans': len(payload),
+        'payload_bytes': len(ORJSONRenderer().render(payload)),
+        'renderer_ms': {
+            'json': _median_ms(lambda: JSONRenderer().render(payload), options['repeat']),
+            'orjson': _median_ms(lambda: ORJSONRenderer().render(payload), options['repeat']),
+        },
+        'endpoint_ms': {
+            'baseline': _median_ms(lambda: respond(baseline_view), options['repeat']),
+            'hot_path': _median_ms(lambda: respond(lean_view), options['repeat']),
+        },
+    }
+    for timings in (results['renderer_ms'], results['endpoint_ms']):
+        before, after = timings.values()
+        timings['speedup'] = round(before / after, 1)
+    return results
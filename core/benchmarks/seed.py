@@ -0,0 +1,73 @@
+from datetime import date
+import random
+
+from dateutil.relativedelta import relativedelta
+
+from core.models import Customer, Loan
+from core.scoring import calculate_emi, rebuild_credit_profiles
+
+
+def loan_counts(rng, customers, loans_per_customer, skew=None):
+    """Loans per customer: uniform, or Pareto-tailed with shape ``skew`` and the same mean."""
+    if not skew:
+        return [loans_per_customer] * customers
+
+    cap = loans_per_customer * 100
+    return [
+        min(cap, round(loans_per_customer * (skew - 1) * (rng.paretovariate(skew) - 1)))
+        for _ in range(customers)
+    ]
+
+
+def seed_dataset(customers, loans_per_customer, seed=0, batch_size=5000, skew=None):
+    """Bulk insert synthetic customers averaging ``loans_per_customer`` loans each.
+
+    With ``skew`` (a Pareto shape above 1, e.g. 1.5) a few customers carry long
+    loan histories while most have short ones.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+
+    first_phone = 9000000000 + Customer.objects.count()
+    new_customers = []
+    for offset in range(customers):
+        salary = rng.randrange(20000, 300000, 1000)
+        new_customers.append(Customer(
+            first_name=f"Bench{offset}",
+            last_name="Customer",
+            age=rng.randint(21, 65),
+            phone_number=first_phone + offset,
+            monthly_salary=salary,
+            approved_limit=round(36 * salary / 100000) * 100000,
+        ))
+    new_customers = Customer.objects.bulk_create(new_customers, batch_size=batch_size)
+
+    loans = []
+    counts = loan_counts(rng, len(new_customers), loans_per_customer, skew)
+    for customer, count in zip(new_customers, counts):
+        for _ in range(count):
+            tenure = rng.choice([6, 12, 24, 36, 60])
+            amount = rng.randrange(10000, 1000000, 1000)
+            rate = rng.choice([8.0, 10.5, 12.0, 14.0, 16.5])
+            start_date = today - relativedelta(months=rng.randint(0, 72))
+            loans.append(Loan(
+                customer=customer,
+                loan_amount=amount,
+                tenure=tenure,
+                interest_rate=rate,
+                monthly_installment=calculate_emi(amount, rate, tenure),
+                emis_paid_on_time=rng.random() < 0.8,
+                start_date=start_date,
+                end_date=start_date + relativedelta(months=tenure),
+            ))
+        if len(loans) >= batch_size:
+            Loan.objects.bulk_create(loans, batch_size=batch_size)
+            loans = []
+    Loan.objects.bulk_create(loans, batch_size=batch_size)
+
+    # Start from the steady state where every customer already has a credit profile
+    customer_ids = [customer.id for customer in new_customers]
+    for offset in range(0, len(customer_ids), batch_size):
+        rebuild_credit_profiles(customer_ids[offset:offset + batch_size])
+
+    return customer_ids
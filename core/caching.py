@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+import threading
+
+from django.conf import settings
+from django.core.cache import cache, caches
+
+from .models import Loan
+
+LOAN_DETAIL_KEY = 'core:loan:{}'
+CUSTOMER_LOANS_KEY = 'core:customer-loans:{}'
+
+_stats = {'hits': 0, 'misses': 0}
+_stats_lock = threading.Lock()
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def coordination_cache():
+    """The cache of rate-limit buckets and primary pins, apart from cached responses."""
+    return caches['coordination']
+
+
+def default_timeout():
+    return getattr(settings, 'LOAN_CACHE_TIMEOUT', 300)
+
+
+def timeout_until_midnight(now=None):
+    """Cap the default timeout so date-dependent entries expire when the day changes."""
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return min(default_timeout(), int((midnight - now).total_seconds()))
+
+
+def get_or_build(key, build, timeout=None):
+    """Return the cached value for ``key``, else ``build()``; ``None`` results are not cached."""
+    value = cache.get(key)
+    if value is not None:
+        _record('hits')
+        return value
+
+    _record('misses')
+    value = build()
+    if value is not None:
+        cache.set(key, value, default_timeout() if timeout is None else timeout)
+    return value
+
+
+async def aget_or_build(key, build, timeout=None):
+    """Async ``get_or_build``; ``build`` is a coroutine function."""
+    value = await cache.aget(key)
+    if value is not None:
+        _record('hits')
+        return value
+
+    _record('misses')
+    value = await build()
+    if value is not None:
+        await cache.aset(key, value, default_timeout() if timeout is None else timeout)
+    return value
+
+
+def invalidate_loans(loan_ids=(), customer_ids=()):
+    keys = [LOAN_DETAIL_KEY.format(loan_id) for loan_id in loan_ids]
+    keys += [CUSTOMER_LOANS_KEY.format(customer_id) for customer_id in customer_ids]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_customers(customer_ids):
+    """Drop every entry that embeds data from ``customer_ids``."""
+    loan_ids = Loan.objects.filter(customer_id__in=customer_ids).values_list('id', flat=True)
+    invalidate_loans(loan_ids, customer_ids)
@@ -0,0 +1,70 @@
+"""System checks for settings that the loan cache, rate limits and replica routing rely on."""
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .routers import replica_aliases
+
+LOCAL_MEMORY_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+DATABASE_CACHE = 'django.core.cache.backends.db.DatabaseCache'
+DUMMY_CACHE = 'django.core.cache.backends.dummy.DummyCache'
+CACHE_ALIASES = ('default', 'coordination')
+# Pins written by one worker must be visible to every other worker
+UNSHARED_CACHES = (LOCAL_MEMORY_CACHE, DUMMY_CACHE)
+# Backends whose incr and add are atomic, as rate-limit buckets need (LocMem per process)
+ATOMIC_CACHES = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    LOCAL_MEMORY_CACHE,
+)
+
+
+def cache_backend(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND')
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    errors = []
+    for alias in CACHE_ALIASES:
+        backend = cache_backend(alias)
+        if backend in UNSHARED_CACHES:
+            errors.append(Error(
+                f"The {alias!r} cache is local to each process, so cache invalidation, rate limits "
+                f"and primary pins in one worker never reach the others.",
+                hint="Set DJANGO_CACHE_BACKEND to Redis or memcached.",
+                id='core.E001',
+            ))
+        elif backend == DATABASE_CACHE:
+            errors.append(Error(
+                f"The {alias!r} cache is the database cache: every hit is a query against the "
+                f"primary, and culling at MAX_ENTRIES evicts unrelated entries.",
+                hint="Set DJANGO_CACHE_BACKEND to Redis or memcached.",
+                id='core.E001',
+            ))
+    return errors
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_pin_cache(app_configs, **kwargs):
+    if not replica_aliases() or cache_backend('coordination') not in UNSHARED_CACHES:
+        return []
+    return [Error(
+        "Read replicas are configured but the coordination cache is not shared between processes, "
+        "so a customer's primary pin is lost when their next read lands on another worker.",
+        hint="Set DJANGO_CACHE_BACKEND to Redis or memcached.",
+        id='core.E002',
+    )]
+
+
+@register(Tags.caches)
+def check_rate_limit_cache(app_configs, **kwargs):
+    backend = cache_backend('coordination')
+    if backend in ATOMIC_CACHES:
+        return []
+    return [Error(
+        f"Rate limits need atomic incr and add, which the coordination cache ({backend}) "
+        f"does not provide; concurrent requests would lose tokens.",
+        hint="Set DJANGO_CACHE_BACKEND to Redis or memcached.",
+        id='core.E003',
+    )]
@@ -0,0 +1,84 @@
+"""``Idempotency-Key`` support for write endpoints.
+
+The key's row is inserted in the same transaction as the request's own writes, so
+the stored response exists exactly when those writes commit. A duplicate sent while
+the first is in flight blocks on the unique index until that transaction ends, then
+replays its response; if the first rolled back, the duplicate runs instead.
+"""
+from datetime import timedelta
+from functools import wraps
+import hashlib
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+import orjson
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def _request_hash(data):
+    return hashlib.sha256(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _replay(record, request_hash):
+    if record.request_hash != request_hash:
+        return Response({"error": f"{HEADER} was already used with a different request."}, status=422)
+    return Response(record.response, status=record.status_code, headers={'Idempotent-Replayed': 'true'})
+
+
+def _live(records):
+    return records.filter(expires_at__gt=timezone.now()).first()
+
+
+def idempotent(endpoint):
+    """Run the decorated view method at most once per ``Idempotency-Key`` header value."""
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None:
+                return view_method(self, request, *args, **kwargs)
+            if not 0 < len(key) <= 255:
+                return Response({"error": f"{HEADER} must be 1 to 255 characters."}, status=400)
+
+            request_hash = _request_hash(request.data)
+            records = IdempotencyKey.objects.filter(endpoint=endpoint, key=key)
+            record = _live(records)
+            if record is not None:
+                return _replay(record, request_hash)
+
+            with transaction.atomic():
+                records.filter(expires_at__lte=timezone.now()).delete()
+                try:
+                    with transaction.atomic():
+                        record = IdempotencyKey.objects.create(
+                            endpoint=endpoint,
+                            key=key,
+                            request_hash=request_hash,
+                            status_code=0,  # filled in below, before anyone can see the row
+                            expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                        )
+                except IntegrityError:
+                    # Another request with this key committed while we waited on the index
+                    return _replay(records.get(), request_hash)
+
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    # Leave nothing behind so a retry runs the request again
+                    transaction.set_rollback(True)
+                    return response
+
+                record.status_code = response.status_code
+                record.response = response.data
+                record.save(update_fields=['status_code', 'response'])
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys():
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
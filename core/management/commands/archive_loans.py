@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.archive import archive_matured_loans
+
+
+class Command(BaseCommand):
+    help = 'Move matured loans from previous years into the loan archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Loans moved per transaction (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        archived = archive_matured_loans(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} loans in {time.perf_counter() - started:.1f}s."
+        ))
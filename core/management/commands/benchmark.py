@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from core.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = 'Run a performance benchmark against a throwaway copy of the database'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='benchmark', required=True)
+        for name, module in BENCHMARKS.items():
+            subparser = subparsers.add_parser(name, help=module.__doc__)
+            subparser.add_argument('--customers', type=int, default=200)
+            subparser.add_argument('--loans-per-customer', type=int, default=10)
+            subparser.add_argument('--output', help="Also write the results JSON to this file")
+            module.add_arguments(subparser)
+
+    def handle(self, *args, **options):
+        module = BENCHMARKS[options['benchmark']]
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            # Benchmarks drive single customers from one client, far past the rate limits
+            with override_settings(RATE_LIMITS={}):
+                results = module.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = json.dumps({'benchmark': options['benchmark'], **results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report)
+        self.stdout.write(report)
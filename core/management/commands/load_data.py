@@ -1,53 +1,222 @@
 import pandas as pd
-from django.core.management.base import BaseCommand
-from core.models import Customer, Loan
-from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from core.caching import invalidate_customers, invalidate_loans
+from core.models import Customer, CustomerCreditProfile, Loan, LoanArchive
+from core.reconciliation import reconcile_current_debt
 import os
+import time
+
+CUSTOMER_UPDATE_FIELDS = [
+    'first_name', 'last_name', 'age', 'phone_number', 'monthly_salary', 'approved_limit', 'current_debt',
+]
+LOAN_UPDATE_FIELDS = [
+    'customer', 'loan_amount', 'tenure', 'interest_rate', 'monthly_installment',
+    'emis_paid_on_time', 'start_date', 'end_date',
+]
+
+
+def _to_dates(column):
+    dates = pd.to_datetime(column)
+    return [None if pd.isnull(value) else value.date() for value in dates]
+
+
+def _read_csv_chunks(path, chunk_size):
+    yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def _read_parquet_chunks(path, chunk_size):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise CommandError("Reading parquet files requires pyarrow to be installed.")
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+        yield batch.to_pandas()
+
+
+def _read_xlsx_chunks(path, chunk_size):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield pd.DataFrame(chunk, columns=header)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=header)
+    finally:
+        workbook.close()
+
+
+READERS = {
+    'csv': _read_csv_chunks,
+    'parquet': _read_parquet_chunks,
+    'xlsx': _read_xlsx_chunks,
+}
+
 
 class Command(BaseCommand):
-    help = 'Load customer and loan data from Excel files'
+    help = 'Load customer and loan data from xlsx, csv or parquet files'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--customers',
+            help='Customer data file (default: data/customer_data.<format>)',
+        )
+        parser.add_argument(
+            '--loans',
+            help='Loan data file (default: data/loan_data.<format>)',
+        )
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Input format (default: taken from the file extension, else xlsx)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Rows read and written per batch (default: 5000)',
+        )
 
-    def handle(self, *args, **kwargs):
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
         base_path = os.path.join(os.getcwd(), 'data')
+        default_format = options['format'] or 'xlsx'
 
         # Load customer data
-        customer_file = os.path.join(base_path, 'customer_data.xlsx')
-        df_customers = pd.read_excel(customer_file)
+        customer_file = options['customers'] or os.path.join(
+            base_path, f'customer_data.{default_format}'
+        )
+        self._ingest('Customer', self._read(customer_file, options['format']), self._load_customers)
 
-        for _, row in df_customers.iterrows():
-            Customer.objects.update_or_create(
+        # Load loan data
+        loan_file = options['loans'] or os.path.join(
+            base_path, f'loan_data.{default_format}'
+        )
+        self.customer_ids = set(Customer.objects.values_list('id', flat=True))
+        self.skipped_loans = 0
+        self.archived_loans = 0
+        self._ingest('Loan', self._read(loan_file, options['format']), self._load_loans)
+        if self.skipped_loans:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {self.skipped_loans} loans for unknown customers."
+            ))
+        if self.archived_loans:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {self.archived_loans} loans that are already archived."
+            ))
+
+        # Explicit ids bypass the sequences, so move them past the loaded rows
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Customer, Loan]):
+                cursor.execute(sql)
+
+        # Customers load with no debt; derive it from their active loans
+        corrected = reconcile_current_debt(self.batch_size)
+        self.stdout.write(
+            f"current_debt set for {corrected['customers']} customers "
+            f"(total drift {corrected['drift']})."
+        )
+
+    def _read(self, path, file_format):
+        if not os.path.exists(path):
+            raise CommandError(f"File not found: {path}")
+
+        file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f"Unsupported format for {path}; pass --format.")
+        return READERS[file_format](path, self.batch_size)
+
+    def _ingest(self, label, chunks, load_batch):
+        started = time.perf_counter()
+        loaded = 0
+
+        for chunk in chunks:
+            with transaction.atomic():
+                loaded += load_batch(chunk)
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label}: {loaded} rows loaded ({loaded / elapsed:,.0f} rows/s)"
+            )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{label} data loaded successfully: {loaded} rows in {elapsed:.1f}s."
+        ))
+
+    def _load_customers(self, chunk):
+        customers = [
+            Customer(
                 id=row['customer_id'],
-                defaults={
-                    'first_name': row['first_name'],
-                    'last_name': row['last_name'],
-                    'age': row['age'],
-                    'phone_number': row['phone_number'],
-                    'monthly_salary': row['monthly_salary'],
-                    'approved_limit': row['approved_limit'],
-                    'current_debt': 0.0
-                }
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                age=row['age'],
+                phone_number=row['phone_number'],
+                monthly_salary=row['monthly_salary'],
+                approved_limit=row['approved_limit'],
+                current_debt=0
             )
-        self.stdout.write(self.style.SUCCESS("Customer data loaded successfully."))
+            for row in chunk.to_dict('records')
+        ]
+        Customer.objects.bulk_create(
+            customers,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=CUSTOMER_UPDATE_FIELDS,
+        )
+        # bulk_create skips the save signals that normally invalidate the cache
+        invalidate_customers([customer.id for customer in customers])
+        return len(customers)
 
-        # Load loan data
-        loan_file = os.path.join(base_path, 'loan_data.xlsx')
-        df_loans = pd.read_excel(loan_file)
+    def _load_loans(self, chunk):
+        loans = []
+        # Archived loans already count through LoanHistory; loading them again would count them twice
+        archived_ids = set(
+            LoanArchive.objects.filter(id__in=chunk['loan_id'].tolist()).values_list('id', flat=True)
+        )
+        rows = zip(
+            chunk.to_dict('records'),
+            _to_dates(chunk['date_of_approval']),
+            _to_dates(chunk['end_date']),
+        )
+        for row, start_date, end_date in rows:
+            if row['customer_id'] not in self.customer_ids:
+                self.skipped_loans += 1
+                continue
+            if row['loan_id'] in archived_ids:
+                self.archived_loans += 1
+                continue
 
-        for _, row in df_loans.iterrows():
-            customer = Customer.objects.get(id=row['customer_id'])
-            Loan.objects.update_or_create(
+            if end_date is None and start_date is not None:
+                end_date = start_date + relativedelta(months=int(row['tenure']))
+
+            loans.append(Loan(
                 id=row['loan_id'],
-                defaults={
-                    'customer': customer,
-                    'loan_amount': row['loan_amount'],
-                    'tenure': row['tenure'],
-                    'interest_rate': row['interest_rate'],
-                    'monthly_payment': row['monthly_payment'],
-                    'emis_paid_on_time': row['emis_paid_on_time'],
-                    'date_of_approval': pd.to_datetime(row['date_of_approval']).date()
-                        if not pd.isnull(row['date_of_approval']) else None,
-                    'end_date': pd.to_datetime(row['end_date']).date()
-                        if not pd.isnull(row['end_date']) else None
-                }
-            )
-        self.stdout.write(self.style.SUCCESS("Loan data loaded successfully."))
+                customer_id=row['customer_id'],
+                loan_amount=row['loan_amount'],
+                tenure=row['tenure'],
+                interest_rate=row['interest_rate'],
+                monthly_installment=row['monthly_payment'],
+                emis_paid_on_time=bool(row['emis_paid_on_time']),
+                start_date=start_date,
+                end_date=end_date
+            ))
+
+        Loan.objects.bulk_create(
+            loans,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=LOAN_UPDATE_FIELDS,
+        )
+        # Profiles of touched customers are rebuilt on their next read
+        customer_ids = {loan.customer_id for loan in loans}
+        CustomerCreditProfile.objects.filter(customer_id__in=customer_ids).delete()
+        invalidate_loans([loan.id for loan in loans], customer_ids)
+        return len(loans)
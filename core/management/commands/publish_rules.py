@@ -0,0 +1,74 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from core.models import DecisionRuleSet
+from core.rules import DEFAULT_RULES, compile_rules
+
+# Publishes that lose the race for a version number retry with the next one
+PUBLISH_ATTEMPTS = 5
+
+
+class Command(BaseCommand):
+    help = 'Publish a new decision rule set version, or reactivate an earlier one'
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('path', nargs='?', help='JSON file with the rules to publish')
+        source.add_argument('--activate', type=int, metavar='VERSION', help='Reactivate a stored version')
+        source.add_argument('--show-default', action='store_true', help='Print the built-in rules as JSON')
+        parser.add_argument('--description', default='', help='Short note stored with the version')
+
+    def handle(self, *args, **options):
+        if options['show_default']:
+            self.stdout.write(json.dumps(DEFAULT_RULES, indent=2))
+            return
+
+        if options['activate'] is not None:
+            with transaction.atomic():
+                try:
+                    rule_set = DecisionRuleSet.objects.select_for_update().get(version=options['activate'])
+                except DecisionRuleSet.DoesNotExist:
+                    raise CommandError(f"No decision rules v{options['activate']}.")
+                self._activate(rule_set)
+        else:
+            try:
+                with open(options['path']) as f:
+                    rules = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['path']}: {e}")
+
+            for attempt in range(1, PUBLISH_ATTEMPTS + 1):
+                try:
+                    with transaction.atomic():
+                        rule_set = DecisionRuleSet(
+                            version=self._next_version(), rules=rules, description=options['description']
+                        )
+                        self._activate(rule_set)
+                    break
+                except IntegrityError:
+                    if attempt == PUBLISH_ATTEMPTS:
+                        raise CommandError("Concurrent publishes kept taking the next version; try again.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Decision rules v{rule_set.version} are active; "
+            f"every process picks them up within its check interval."
+        ))
+
+    def _next_version(self):
+        # Locking every stored version queues concurrent publishes. The one that waited
+        # does not see the version committed meanwhile (nor is there anything to lock in
+        # an empty table), so it may pick a taken number and retry.
+        versions = DecisionRuleSet.objects.select_for_update().values_list('version', flat=True)
+        return max(versions, default=0) + 1
+
+    def _activate(self, rule_set):
+        try:
+            compile_rules(rule_set.version, rule_set.rules)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        DecisionRuleSet.objects.exclude(pk=rule_set.pk).update(is_active=False)
+        rule_set.is_active = True
+        rule_set.save()
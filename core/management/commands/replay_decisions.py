@@ -0,0 +1,98 @@
+from contextlib import nullcontext
+from datetime import date
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import DecisionRuleSet
+from core.replay import read_log, replay_log, stored_rules, summarize
+from core.rules import active_rules, compile_rules
+
+
+class Command(BaseCommand):
+    help = 'Replay logged check-eligibility and create-loan requests under a baseline and a candidate rule set'
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', help='JSONL file of logged requests')
+        parser.add_argument(
+            '--baseline', type=int, metavar='VERSION',
+            help='Stored rules version to compare against (default: the active version)',
+        )
+        candidate = parser.add_mutually_exclusive_group()
+        candidate.add_argument(
+            '--candidate', type=int, metavar='VERSION',
+            help='Stored rules version to try (default: the baseline)',
+        )
+        candidate.add_argument('--candidate-file', help='JSON rules file to try without publishing it')
+        parser.add_argument(
+            '--today', type=date.fromisoformat,
+            help='Date the snapshot is scored as of, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Worker processes (default: one per CPU)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=200,
+            help='Requests handed to a worker at a time (default: 200)',
+        )
+        parser.add_argument('--output', help='Write one JSON result row per request to this file')
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options['log']):
+            raise CommandError(f"File not found: {options['log']}")
+
+        baseline_version = options['baseline']
+        if baseline_version is None:
+            baseline_version = active_rules().version
+        baseline = (baseline_version, self._stored(baseline_version))
+
+        if options['candidate_file']:
+            try:
+                with open(options['candidate_file']) as f:
+                    candidate = (None, json.load(f))
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['candidate_file']}: {e}")
+        elif options['candidate'] is not None:
+            candidate = (options['candidate'], self._stored(options['candidate']))
+        else:
+            candidate = baseline
+
+        for version, rules in (baseline, candidate):
+            try:
+                compile_rules(version, rules)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        started = time.perf_counter()
+        rows = []
+        malformed = []
+        with open(options['output'], 'w') if options['output'] else nullcontext() as output:
+            for row in replay_log(
+                read_log(options['log'], malformed), baseline, candidate,
+                options['workers'], options['chunk_size'], options['today'],
+            ):
+                rows.append(row)
+                if output:
+                    output.write(json.dumps(row) + '\n')
+        elapsed = time.perf_counter() - started
+
+        for number, reason in malformed:
+            self.stderr.write(f"Skipped malformed line {number} of {options['log']}: {reason}")
+
+        report = {
+            'baseline_version': baseline[0],
+            'candidate_version': candidate[0],
+            'workers': options['workers'],
+            'malformed_lines': len(malformed),
+            **summarize(rows, elapsed),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _stored(self, version):
+        try:
+            return stored_rules(version)
+        except DecisionRuleSet.DoesNotExist:
+            raise CommandError(f"No decision rules v{version}.")
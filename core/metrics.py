@@ -0,0 +1,80 @@
+"""In-process request metrics, rendered in the Prometheus text exposition format.
+
+Each worker process keeps its own numbers; scrape every worker (or aggregate in
+Prometheus) when running several.
+"""
+from bisect import bisect_left
+import threading
+
+from .caching import cache_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.total}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+HISTOGRAMS = {
+    'credit_api_request_duration_seconds': ('Wall time per request', LATENCY_BUCKETS),
+    'credit_api_db_duration_seconds': ('Database time per request', LATENCY_BUCKETS),
+    'credit_api_db_queries': ('Database queries per request', QUERY_COUNT_BUCKETS),
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_responses = {}
+
+
+def observe_request(view, status, seconds, db_seconds, db_queries):
+    with _lock:
+        histograms = _histograms.get(view)
+        if histograms is None:
+            histograms = _histograms[view] = {
+                name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()
+            }
+        histograms['credit_api_request_duration_seconds'].observe(seconds)
+        histograms['credit_api_db_duration_seconds'].observe(db_seconds)
+        histograms['credit_api_db_queries'].observe(db_queries)
+        _responses[view, status] = _responses.get((view, status), 0) + 1
+
+
+def render_prometheus():
+    with _lock:
+        lines = []
+        for name, (description, _) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {description}.')
+            lines.append(f'# TYPE {name} histogram')
+            for view, histograms in sorted(_histograms.items()):
+                lines.extend(histograms[name].render(name, f'view="{view}"'))
+
+        lines.append('# HELP credit_api_responses_total Responses by view and status code.')
+        lines.append('# TYPE credit_api_responses_total counter')
+        for (view, status), count in sorted(_responses.items()):
+            lines.append(f'credit_api_responses_total{{view="{view}",status="{status}"}} {count}')
+
+    stats = cache_stats()
+    lines.append('# HELP credit_api_cache_requests_total Loan cache lookups by outcome.')
+    lines.append('# TYPE credit_api_cache_requests_total counter')
+    lines.append(f'credit_api_cache_requests_total{{outcome="hit"}} {stats["hits"]}')
+    lines.append(f'credit_api_cache_requests_total{{outcome="miss"}} {stats["misses"]}')
+    return '\n'.join(lines) + '\n'
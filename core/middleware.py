@@ -0,0 +1,88 @@
+from contextvars import ContextVar
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+# (seconds, sql) of each query in the current request; None outside requests.
+# Context variables follow async ORM calls into their worker thread, whose
+# connection differs from the one of the thread that handles the request.
+_request_queries = ContextVar('request_queries', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries.append((time.perf_counter() - started, sql))
+
+
+def install_query_recorder(connection):
+    """Add ``record_query`` to a database connection once; see core.signals."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """Record wall time, query count and database time for each request, by URL name.
+
+    Runs natively under both WSGI and ASGI, so async views are not pushed through a
+    thread by this middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_request_seconds = getattr(settings, 'SLOW_REQUEST_SECONDS', None)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        queries = []
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = []
+        token = _request_queries.set(queries)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.observe(request, response, time.perf_counter() - started, queries)
+        return response
+
+    def observe(self, request, response, elapsed, queries):
+        match = request.resolver_match
+        view = (match.url_name or match.route) if match else 'unmatched'
+        db_seconds = sum(duration for duration, _ in queries)
+        observe_request(view, response.status_code, elapsed, db_seconds, len(queries))
+
+        if self.slow_request_seconds is not None and elapsed >= self.slow_request_seconds:
+            logger.warning(
+                "Slow request %s %s (%s): %.3fs, %d queries, %.3fs in the database\n%s",
+                request.method, request.path, view, elapsed, len(queries), db_seconds,
+                '\n'.join(f'  [{duration * 1000:.1f}ms] {sql}' for duration, sql in queries),
+            )
@@ -0,0 +1,23 @@
+"""Schema operations shared by core's migrations."""
+from django.contrib.postgres.operations import AddIndexConcurrently as PostgresAddIndexConcurrently
+from django.db import migrations
+
+
+class AddIndexConcurrently(PostgresAddIndexConcurrently):
+    """``CREATE INDEX CONCURRENTLY`` on PostgreSQL, so writes to the table carry on during the build.
+
+    Other backends, such as SQLite in development, get a plain ``AddIndex``. Migrations
+    using this operation must set ``atomic = False``.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
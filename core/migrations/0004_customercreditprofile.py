@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 17:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_loan_emis_paid_on_time_alter_loan_tenure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerCreditProfile',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_profile', serialize=False, to='core.customer')),
+                ('total_loans', models.IntegerField(default=0)),
+                ('on_time_loans', models.IntegerField(default=0)),
+                ('current_year', models.IntegerField(help_text='Year that current_year_loans refers to')),
+                ('current_year_loans', models.IntegerField(default=0)),
+                ('approved_volume', models.FloatField(default=0)),
+                ('active_debt', models.FloatField(default=0)),
+                ('active_emis', models.FloatField(default=0)),
+                ('next_expiry', models.DateField(blank=True, help_text='Earliest end_date among the active loans', null=True)),
+                ('refreshed_on', models.DateField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0004_customercreditprofile'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'end_date'], include=('loan_amount', 'interest_rate', 'monthly_installment'), name='loan_customer_end_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'start_date'], include=('loan_amount', 'emis_paid_on_time'), name='loan_customer_start_date_idx'),
+        ),
+        # Drop the foreign key's own index only once the composite indexes can serve its lookups
+        migrations.AlterField(
+            model_name='loan',
+            name='customer',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='loans', to='core.customer'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_loan_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PortfolioSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField(unique=True)),
+                ('customers', models.IntegerField()),
+                ('active_loans', models.IntegerField()),
+                ('outstanding_exposure', models.FloatField(help_text='Sum of active loan amounts')),
+                ('active_emis', models.FloatField(help_text='Sum of active monthly installments')),
+                ('customers_over_emi_limit', models.IntegerField(help_text='Customers whose active EMIs exceed 50% of monthly salary')),
+                ('emi_to_salary', models.JSONField(help_text='Customer counts per EMI-to-salary bucket')),
+                ('score_bands', models.JSONField(help_text='Customer counts per credit-score band')),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanHistory',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='loan_history', serialize=False, to='core.customer')),
+                ('total_loans', models.IntegerField(default=0)),
+                ('on_time_loans', models.IntegerField(default=0)),
+                ('approved_volume', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LoanArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('loan_amount', models.FloatField()),
+                ('tenure', models.IntegerField(help_text='Tenure in months')),
+                ('interest_rate', models.FloatField()),
+                ('monthly_installment', models.FloatField()),
+                ('emis_paid_on_time', models.BooleanField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_loans', to='core.customer')),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_loan_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DecisionRuleSet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(unique=True)),
+                ('rules', models.JSONField()),
+                ('is_active', models.BooleanField(db_index=True, default=False)),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='rule_version',
+            field=models.PositiveIntegerField(blank=True, help_text='Decision rule version that approved the loan', null=True),
+        ),
+        migrations.AddField(
+            model_name='loanarchive',
+            name='rule_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
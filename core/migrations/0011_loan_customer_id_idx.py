@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_decision_rules'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='loan',
+            index=models.Index(fields=['customer', 'id'], name='loan_customer_id_idx'),
+        ),
+    ]
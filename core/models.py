@@ -1,3 +1,5 @@
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from datetime import timedelta, date
 from dateutil.relativedelta import relativedelta  # you will need to install python-dateutil
@@ -15,7 +17,10 @@ class Customer(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 class Loan(models.Model):
-    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loans')
+    # Indexed through the composite indexes below, which lead with customer
+    customer = models.ForeignKey(
+        Customer, on_delete=models.CASCADE, related_name='loans', db_index=False
+    )
     loan_amount = models.FloatField()
     tenure = models.IntegerField(help_text="Tenure in months")
     interest_rate = models.FloatField()
@@ -23,6 +28,27 @@ class Loan(models.Model):
     emis_paid_on_time = models.BooleanField()
     start_date = models.DateField()
     end_date = models.DateField()
+    rule_version = models.PositiveIntegerField(
+        null=True, blank=True, help_text="Decision rule version that approved the loan"
+    )
+
+    class Meta:
+        indexes = [
+            # Active-loan reads: view-loans, active debt and EMI totals
+            models.Index(
+                fields=['customer', 'end_date'],
+                include=['loan_amount', 'interest_rate', 'monthly_installment'],
+                name='loan_customer_end_date_idx',
+            ),
+            # start_date__year compiles to a date range, so this serves current-year counts
+            models.Index(
+                fields=['customer', 'start_date'],
+                include=['loan_amount', 'emis_paid_on_time'],
+                name='loan_customer_start_date_idx',
+            ),
+            # Keyset pages of view-loans walk a customer's loans in id order
+            models.Index(fields=['customer', 'id'], name='loan_customer_id_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.end_date and self.start_date and self.tenure:
@@ -31,3 +57,154 @@ class Loan(models.Model):
 
     def __str__(self):
         return f"Loan {self.id} for {self.customer}"
+
+
+class LoanArchive(models.Model):
+    """A matured loan moved out of the hot ``Loan`` table by core.archive; ids are kept."""
+
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='archived_loans')
+    loan_amount = models.FloatField()
+    tenure = models.IntegerField(help_text="Tenure in months")
+    interest_rate = models.FloatField()
+    monthly_installment = models.FloatField()
+    emis_paid_on_time = models.BooleanField()
+    start_date = models.DateField()
+    end_date = models.DateField()
+    rule_version = models.PositiveIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived loan {self.id} for {self.customer}"
+
+
+class LoanHistory(models.Model):
+    """Score inputs contributed by a customer's archived loans."""
+
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='loan_history'
+    )
+    total_loans = models.IntegerField(default=0)
+    on_time_loans = models.IntegerField(default=0)
+    approved_volume = models.FloatField(default=0)
+
+    # Archived loans are closed and started before the current year, so they add to no other input
+    COUNTER_FIELDS = ('total_loans', 'on_time_loans', 'approved_volume')
+
+    def __str__(self):
+        return f"Loan history for {self.customer_id}"
+
+
+class DecisionRuleSet(models.Model):
+    """A version of the scoring weights and interest-rate bands, compiled by core.rules."""
+
+    version = models.PositiveIntegerField(unique=True)
+    rules = models.JSONField()
+    is_active = models.BooleanField(default=False, db_index=True)
+    description = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def clean(self):
+        from .rules import compile_rules
+
+        try:
+            compile_rules(self.version, self.rules)
+        except ValueError as e:
+            raise ValidationError({'rules': str(e)})
+
+    def __str__(self):
+        return f"Decision rules v{self.version}"
+
+
+class CustomerCreditProfile(models.Model):
+    """Denormalized credit-score inputs, kept in step with the customer's loans."""
+
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, primary_key=True, related_name='credit_profile'
+    )
+    total_loans = models.IntegerField(default=0)
+    on_time_loans = models.IntegerField(default=0)
+    current_year = models.IntegerField(help_text="Year that current_year_loans refers to")
+    current_year_loans = models.IntegerField(default=0)
+    approved_volume = models.FloatField(default=0)
+    active_debt = models.FloatField(default=0)
+    active_emis = models.FloatField(default=0)
+    next_expiry = models.DateField(
+        null=True, blank=True, help_text="Earliest end_date among the active loans"
+    )
+    refreshed_on = models.DateField()
+
+    SCORE_FIELDS = (
+        'total_loans',
+        'on_time_loans',
+        'current_year_loans',
+        'approved_volume',
+        'active_debt',
+        'active_emis',
+    )
+
+    def is_stale(self, today):
+        # A new year resets current_year_loans; an expired loan leaves active totals.
+        if self.current_year != today.year:
+            return True
+        return self.next_expiry is not None and self.next_expiry < today
+
+    def as_aggregates(self):
+        return {field: getattr(self, field) for field in self.SCORE_FIELDS}
+
+    def __str__(self):
+        return f"Credit profile for {self.customer_id}"
+
+
+class PortfolioSnapshot(models.Model):
+    """Daily book-wide exposure figures, built by core.tasks.build_portfolio_snapshot."""
+
+    as_of = models.DateField(unique=True)
+    customers = models.IntegerField()
+    active_loans = models.IntegerField()
+    outstanding_exposure = models.FloatField(help_text="Sum of active loan amounts")
+    active_emis = models.FloatField(help_text="Sum of active monthly installments")
+    customers_over_emi_limit = models.IntegerField(
+        help_text="Customers whose active EMIs exceed 50% of monthly salary"
+    )
+    emi_to_salary = models.JSONField(help_text="Customer counts per EMI-to-salary bucket")
+    score_bands = models.JSONField(help_text="Customer counts per credit-score band")
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Portfolio snapshot {self.as_of}"
+
+
+class OutboxEvent(models.Model):
+    """A side effect recorded in the writing transaction and run later by core.outbox.
+
+    Events are deleted once handled, so the table only holds pending and failing ones.
+    """
+
+    topic = models.CharField(max_length=50)
+    payload = models.JSONField()
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.topic} event {self.id}"
+
+
+class IdempotencyKey(models.Model):
+    """The stored outcome of a write request sent with an ``Idempotency-Key`` header."""
+
+    endpoint = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 of the request body")
+    status_code = models.SmallIntegerField()
+    response = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['endpoint', 'key'], name='idempotency_endpoint_key_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.endpoint} {self.key}"
@@ -0,0 +1,87 @@
+"""Transactional outbox for side effects that must not slow down or fail a write.
+
+``publish()`` stores an event in the caller's transaction, so it exists exactly when
+the write commits. ``process_outbox()`` runs the registered handler for each event,
+deleting it on success and recording the error otherwise. Delivery is at least once,
+so handlers must be idempotent.
+"""
+from datetime import date
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+from .caching import invalidate_loans
+from .models import Customer, OutboxEvent
+from .reconciliation import active_debt_expression
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+def handles(topic):
+    def register(handler):
+        HANDLERS[topic] = handler
+        return handler
+    return register
+
+
+def publish(topic, **payload):
+    """Record an event in the current transaction; it is handled only if that commits."""
+    OutboxEvent.objects.create(topic=topic, payload=payload)
+    if settings.OUTBOX_EAGER:
+        transaction.on_commit(process_outbox)
+
+
+def process_outbox(batch_size=500):
+    """Handle pending events oldest first and return how many succeeded.
+
+    Rows are claimed with SKIP LOCKED, so several workers can drain in parallel.
+    """
+    handled = 0
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True)
+                .filter(id__gt=last_id, attempts__lt=settings.OUTBOX_MAX_ATTEMPTS)
+                .order_by('id')[:batch_size]
+            )
+            if not events:
+                break
+
+            done = []
+            failed = []
+            for event in events:
+                try:
+                    with transaction.atomic():
+                        HANDLERS[event.topic](event.payload)
+                except Exception as e:
+                    logger.exception("Outbox event %s failed", event.id)
+                    event.attempts += 1
+                    event.last_error = repr(e)
+                    failed.append(event)
+                else:
+                    done.append(event.id)
+
+            OutboxEvent.objects.filter(id__in=done).delete()
+            OutboxEvent.objects.bulk_update(failed, ['attempts', 'last_error'])
+
+        handled += len(done)
+        last_id = events[-1].id
+    return handled
+
+
+@handles('loan.created')
+def apply_new_loan(payload):
+    """Bring the customer's ``current_debt`` up to date and drop their cached loans.
+
+    ``current_debt`` is recomputed from the active loans rather than incremented, so
+    handling an event twice leaves it unchanged.
+    """
+    customer_id = payload['customer_id']
+    # create-loan holds this lock while adding a loan, so the total sees every committed one
+    list(Customer.objects.select_for_update().filter(pk=customer_id).values_list('pk'))
+    Customer.objects.filter(pk=customer_id).update(current_debt=active_debt_expression(date.today()))
+    invalidate_loans([payload['loan_id']], [customer_id])
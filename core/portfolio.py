@@ -0,0 +1,122 @@
+from datetime import date
+from itertools import islice
+
+from django.db.models import BooleanField, ExpressionWrapper, Q
+import numpy as np
+
+from .models import Customer, CustomerCreditProfile, Loan, LoanHistory, PortfolioSnapshot
+from .rules import active_rules
+from .scoring import calculate_credit_scores, exceeds_emi_limit
+
+# Upper edges of the EMI-to-salary buckets; the last bucket is open-ended
+EMI_TO_SALARY_EDGES = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8, 1.0)
+
+
+def _emi_bucket_labels():
+    lower = (0.0, *EMI_TO_SALARY_EDGES)
+    upper = (*EMI_TO_SALARY_EDGES, None)
+    return [f"{low:.1f}-{high:.1f}" if high else f"{low:.1f}+" for low, high in zip(lower, upper)]
+
+
+def _customer_loan_arrays(customer_ids, today, batch_size):
+    """Per-customer score inputs for a sorted id chunk, streamed from a server-side cursor."""
+    loans = (
+        Loan.objects.filter(customer_id__gte=customer_ids[0], customer_id__lte=customer_ids[-1])
+        .annotate(
+            is_active=ExpressionWrapper(Q(end_date__gte=today), output_field=BooleanField()),
+            is_current_year=ExpressionWrapper(
+                Q(start_date__year=today.year), output_field=BooleanField()
+            ),
+        )
+        .values_list(
+            'customer_id', 'loan_amount', 'monthly_installment',
+            'emis_paid_on_time', 'is_active', 'is_current_year',
+        )
+        .iterator(chunk_size=batch_size)
+    )
+
+    size = len(customer_ids)
+    arrays = {field: np.zeros(size) for field in (*CustomerCreditProfile.SCORE_FIELDS, 'active_loans')}
+    while batch := list(islice(loans, batch_size)):
+        rows = np.array(batch, dtype=float)
+        index = np.searchsorted(customer_ids, rows[:, 0])
+        amount, emi, on_time, active, current_year = rows[:, 1:].T
+
+        def add(field, weights=None):
+            arrays[field] += np.bincount(index, weights=weights, minlength=size)
+
+        add('total_loans')
+        add('on_time_loans', on_time)
+        add('current_year_loans', current_year)
+        add('approved_volume', amount)
+        add('active_debt', amount * active)
+        add('active_emis', emi * active)
+        add('active_loans', active)
+
+    # Archived loans count through their customers' history counters
+    history = np.array(
+        LoanHistory.objects.filter(customer_id__gte=customer_ids[0], customer_id__lte=customer_ids[-1])
+        .values_list('customer_id', *LoanHistory.COUNTER_FIELDS),
+        dtype=float,
+    ).reshape(-1, len(LoanHistory.COUNTER_FIELDS) + 1)
+    index = np.searchsorted(customer_ids, history[:, 0])
+    for column, field in enumerate(LoanHistory.COUNTER_FIELDS, 1):
+        arrays[field][index] += history[:, column]
+    return arrays
+
+
+def build_portfolio_snapshot(today=None, chunk_size=5000):
+    """Aggregate the whole book in one keyset-chunked pass and store the day's snapshot."""
+    today = today or date.today()
+    totals = {'customers': 0, 'active_loans': 0, 'outstanding_exposure': 0.0, 'active_emis': 0.0}
+    over_emi_limit = 0
+    emi_buckets = np.zeros(len(EMI_TO_SALARY_EDGES) + 1, dtype=int)
+    # One rule set for the whole pass, even if a new version is published meanwhile
+    rules = active_rules()
+    band_labels = rules.score_band_labels()
+    score_bands = np.zeros(len(band_labels), dtype=int)
+
+    last_id = 0
+    while True:
+        customers = list(
+            Customer.objects.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'monthly_salary', 'approved_limit')[:chunk_size]
+        )
+        if not customers:
+            break
+        customer_ids, salaries, approved_limits = (np.array(column) for column in zip(*customers))
+        last_id = int(customer_ids[-1])
+
+        arrays = _customer_loan_arrays(customer_ids, today, chunk_size)
+        # No EMIs is a ratio of 0 even without a salary, as in exceeds_emi_limit
+        with np.errstate(divide='ignore', invalid='ignore'):
+            emi_ratio = np.where(
+                arrays['active_emis'] > 0,
+                np.where(salaries > 0, arrays['active_emis'] / salaries, np.inf),
+                0.0,
+            )
+        scores = calculate_credit_scores(arrays, approved_limits, rules)
+
+        totals['customers'] += len(customers)
+        totals['active_loans'] += int(arrays['active_loans'].sum())
+        totals['outstanding_exposure'] += float(arrays['active_debt'].sum())
+        totals['active_emis'] += float(arrays['active_emis'].sum())
+        over_emi_limit += int(np.count_nonzero(exceeds_emi_limit(arrays['active_emis'], salaries)))
+        emi_buckets += np.bincount(
+            np.digitize(emi_ratio, EMI_TO_SALARY_EDGES), minlength=len(emi_buckets)
+        )
+        # Same bands as approval_for_score
+        score_bands += np.bincount(
+            np.digitize(scores, rules.floors, right=True), minlength=len(score_bands)
+        )
+
+    snapshot, _ = PortfolioSnapshot.objects.update_or_create(
+        as_of=today,
+        defaults={
+            **totals,
+            'customers_over_emi_limit': over_emi_limit,
+            'emi_to_salary': dict(zip(_emi_bucket_labels(), emi_buckets.tolist())),
+            'score_bands': dict(zip(band_labels, score_bands.tolist())),
+        },
+    )
+    return snapshot
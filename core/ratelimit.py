@@ -0,0 +1,104 @@
+"""Token-bucket admission control per endpoint, customer and client.
+
+Each bucket is a single entry in the coordination cache holding the bucket's
+theoretical arrival time (GCRA) in milliseconds: the moment it would be full again.
+Admitting a request adds one refill interval with ``incr``, and a new bucket is
+created with ``add``. Both are atomic, and ``incr`` keeps the entry's expiry, only on
+Redis and memcached (or per process on LocMem), so core.checks rejects other
+backends. Entries live ``BUCKET_LIFETIME`` full refills; a bucket that expires while
+in debt starts over full, so sustained throughput can exceed the refill rate by at
+most one burst per lifetime.
+"""
+import math
+import time
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from .caching import coordination_cache
+
+BUCKET_KEY = 'core:rate:{}:{}:{}'
+BUCKET_LIFETIME = 10
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def take_token(key, burst, per_second):
+    """Take a token from the bucket at ``key``; returns ``None`` or seconds to wait."""
+    cache = coordination_cache()
+    interval = max(1, round(1000 / per_second))
+    now = _now_ms()
+    timeout = max(1, burst * interval * BUCKET_LIFETIME // 1000)
+    try:
+        tat = cache.incr(key, interval)
+    except ValueError:
+        # New bucket; when a concurrent request created it first, take from that one
+        if cache.add(key, now + interval, timeout):
+            tat = now + interval
+        else:
+            tat = cache.incr(key, interval)
+
+    # A bucket that refilled completely while idle starts over full
+    if tat < now + interval:
+        tat = now + interval
+        cache.set(key, tat, timeout)
+
+    excess = tat - now - burst * interval
+    if excess > 0:
+        # Hand back the token so clients that honour Retry-After get in
+        try:
+            cache.decr(key, interval)
+        except ValueError:
+            pass
+        return excess / 1000
+    return None
+
+
+def bucket_for(request, customer_id=None):
+    """Return ``(key, limit)`` for the request's endpoint, or ``None`` when it is unlimited."""
+    url_name = request.resolver_match.url_name if request.resolver_match else None
+    limit = settings.RATE_LIMITS.get(url_name)
+    if limit is None:
+        return None
+
+    client = None
+    if settings.RATE_LIMIT_TRUST_CLIENT_ID:
+        client = request.META.get('HTTP_X_CLIENT_ID')
+    client = client or BaseThrottle().get_ident(request)
+    return BUCKET_KEY.format(url_name, _customer_key(customer_id), client), limit
+
+
+def _customer_key(customer_id):
+    # customer_id comes from the body before the view validates it, and memcached
+    # rejects keys with spaces or over 250 characters
+    try:
+        customer_id = int(customer_id)
+    except (TypeError, ValueError, OverflowError):
+        return '*'
+    return customer_id if 0 < customer_id < 2 ** 63 else '*'
+
+
+def retry_after(wait):
+    """Retry-After header value, matching DRF's rounding."""
+    return str(math.ceil(wait))
+
+
+class CustomerRateThrottle(BaseThrottle):
+    """Token bucket per endpoint, customer and client, configured by ``RATE_LIMITS``."""
+
+    def allow_request(self, request, view):
+        data = request.data
+        customer_id = data.get('customer_id') if isinstance(data, dict) else view.kwargs.get('customer_id')
+
+        bucket = bucket_for(request, customer_id)
+        if bucket is None:
+            return True
+
+        key, limit = bucket
+        self.retry_after = take_token(key, limit['burst'], limit['per_second'])
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,61 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Abs, Cast, Coalesce, Round
+
+from .models import Customer, Loan
+
+
+def active_debt_expression(today):
+    """``current_debt`` as it should be: the rounded sum of the customer's active loans."""
+    totals = (
+        Loan.objects.filter(customer=OuterRef('pk'), end_date__gte=today)
+        .values('customer')
+        .annotate(total=Sum('loan_amount'))
+        .values('total')
+    )
+    return Cast(
+        Round(Coalesce(Subquery(totals), Value(0.0), output_field=FloatField())),
+        IntegerField(),
+    )
+
+
+def reconcile_current_debt(chunk_size=10000, today=None):
+    """Reset ``Customer.current_debt`` to the active loan total, in keyset chunks of customers.
+
+    Each chunk is locked first, so loans created concurrently are either counted or
+    wait for the chunk to finish. Returns the number of customers corrected and the
+    total absolute drift.
+    """
+    today = today or date.today()
+    active_debt = active_debt_expression(today)
+    corrected = {'customers': 0, 'drift': 0}
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Customer.objects.select_for_update()
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+
+            drifted = (
+                Customer.objects.filter(id__gte=ids[0], id__lte=ids[-1])
+                .annotate(active_debt=active_debt)
+                .exclude(current_debt=F('active_debt'))
+            )
+            chunk = drifted.aggregate(
+                customers=Count('id'), drift=Sum(Abs(F('current_debt') - F('active_debt')))
+            )
+            if chunk['customers']:
+                Customer.objects.filter(id__in=drifted.values('id')).update(current_debt=active_debt)
+                corrected['customers'] += chunk['customers']
+                corrected['drift'] += chunk['drift']
+
+        last_id = ids[-1]
+    return corrected
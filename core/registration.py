@@ -0,0 +1,98 @@
+from django.db import transaction
+import numpy as np
+
+from .models import Customer
+from .routers import pin_new_customers
+
+REQUIRED_FIELDS = ('first_name', 'last_name', 'phone_number', 'age', 'monthly_income')
+
+
+def approved_limits(monthly_incomes):
+    """36x monthly income rounded to the nearest lakh, for an array of incomes."""
+    return np.round(36 * np.asarray(monthly_incomes, dtype=float) / 100000).astype(np.int64) * 100000
+
+
+def customer_data(customer):
+    return {
+        "customer_id": customer.id,
+        "name": f"{customer.first_name} {customer.last_name}",
+        "age": customer.age,
+        "monthly_income": customer.monthly_salary,
+        "approved_limit": customer.approved_limit,
+        "phone_number": customer.phone_number
+    }
+
+
+def _parse_entry(entry):
+    """Return ``(customer, error)`` for one registration entry; the customer has no limit yet."""
+    if not isinstance(entry, dict) or not all(entry.get(field) for field in REQUIRED_FIELDS):
+        return None, "All fields are required."
+
+    try:
+        age = int(entry['age'])
+        monthly_income = int(entry['monthly_income'])
+    except (TypeError, ValueError):
+        return None, "Age and monthly_income must be integers."
+
+    try:
+        phone_number = int(entry['phone_number'])
+    except (TypeError, ValueError):
+        return None, "phone_number must be an integer."
+
+    return Customer(
+        first_name=entry['first_name'],
+        last_name=entry['last_name'],
+        age=age,
+        phone_number=phone_number,
+        monthly_salary=monthly_income,
+        current_debt=0
+    ), None
+
+
+def register_customers(entries, batch_size=5000):
+    """Validate and insert ``entries``, returning one result per entry in input order.
+
+    Successful entries get the register response; rejected ones get
+    ``{"error": ..., "status": 400}``. Raises ``IntegrityError`` if a phone number
+    was registered concurrently, in which case nothing is inserted.
+    """
+    results = [None] * len(entries)
+    parsed = []
+    for index, entry in enumerate(entries):
+        customer, error = _parse_entry(entry)
+        if error:
+            results[index] = {"error": error, "status": 400}
+        else:
+            parsed.append((index, customer))
+
+    registered = set(
+        Customer.objects.filter(
+            phone_number__in={customer.phone_number for _, customer in parsed}
+        ).values_list('phone_number', flat=True)
+    )
+
+    pending = []
+    seen = set()
+    for index, customer in parsed:
+        if customer.phone_number in registered:
+            results[index] = {"error": "Phone number already registered.", "status": 400}
+        elif customer.phone_number in seen:
+            results[index] = {"error": "Phone number appears earlier in the batch.", "status": 400}
+        else:
+            seen.add(customer.phone_number)
+            pending.append((index, customer))
+
+    if pending:
+        limits = approved_limits([customer.monthly_salary for _, customer in pending])
+        for (_, customer), limit in zip(pending, limits):
+            customer.approved_limit = int(limit)
+
+        with transaction.atomic():
+            Customer.objects.bulk_create([customer for _, customer in pending], batch_size=batch_size)
+
+        # bulk_create skips the save signals that pin new customers to the primary
+        pin_new_customers([customer.id for _, customer in pending])
+        for index, customer in pending:
+            results[index] = customer_data(customer)
+
+    return results
@@ -0,0 +1,29 @@
+import orjson
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Dates and datetimes go through DRF's encoder so output matches JSONRenderer
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONRenderer(BaseRenderer):
+    """JSON renderer backed by orjson; NaN and infinite floats render as ``null``."""
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=self.encoder.default, option=ORJSON_OPTIONS)
+
+
+class FirstRendererNegotiation(DefaultContentNegotiation):
+    """Skip Accept header matching and always respond with the view's first renderer."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
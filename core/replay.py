@@ -0,0 +1,214 @@
+"""Replay recorded ``check-eligibility`` and ``create-loan`` requests under two rule sets.
+
+Each line of the log is a JSON object::
+
+    {"endpoint": "check-eligibility", "request": {...}, "response": {...}}
+
+``response`` is optional; when present the baseline decision is checked against it.
+Requests are decided in-process by ``eligibility_result``, the function behind
+``CheckEligibilityView``, once per rule set and without writing anything, so the
+database stays a frozen snapshot and every run over it gives the same decisions.
+``create-loan`` requests are decided the same way: its debt check is already part
+of the credit score, and no loan is created. Like the view, they get no
+``monthly_installment`` when the customer's debt exceeds their approved limit.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import repeat
+import json
+import multiprocessing
+import time
+
+from django.db import connections
+import numpy as np
+
+from .models import Customer, DecisionRuleSet
+from .routers import replica_reads
+from .rules import DEFAULT_RULES, compile_rules
+from .scoring import get_loan_aggregates
+from .views import eligibility_result
+
+ENDPOINTS = ('check-eligibility', 'create-loan')
+DECISION_FIELDS = ('approval', 'corrected_interest_rate', 'monthly_installment')
+
+# Compiled (baseline, candidate) rules of a worker process, set by _init_worker
+_rules = None
+
+
+def stored_rules(version):
+    """The rules dict of a stored version; version 0 is the built-in ``DEFAULT_RULES``."""
+    if version == 0:
+        return DEFAULT_RULES
+    return DecisionRuleSet.objects.get(version=version).rules
+
+
+def _malformed_reason(record):
+    if not isinstance(record, dict):
+        return "expected a JSON object"
+    for field in ('request', 'response'):
+        if record.get(field) is not None and not isinstance(record[field], dict):
+            return f"{field} must be a JSON object"
+    customer_id = (record.get('request') or {}).get('customer_id')
+    if customer_id is not None and not (
+        type(customer_id) is int or (isinstance(customer_id, str) and customer_id.isdigit())
+    ):
+        return f"request.customer_id must be an integer, not {customer_id!r}"
+    return None
+
+
+def read_log(path, malformed=None):
+    """Yield ``(line number, record)`` for each logged request in the file at ``path``.
+
+    Malformed lines are skipped; ``(line number, reason)`` is appended to the
+    ``malformed`` list, when one is given, for each of them.
+    """
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                reason = f"invalid JSON ({e})"
+            else:
+                reason = _malformed_reason(record)
+
+            if reason is None:
+                yield number, record
+            elif malformed is not None:
+                malformed.append((number, reason))
+
+
+def _decide(rules, customer, aggregates, body):
+    started = time.perf_counter()
+    result, status = eligibility_result(
+        customer, aggregates, body['loan_amount'], body['interest_rate'], body['tenure'], rules
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if status != 200:
+        return {'status': status, 'ms': elapsed_ms}
+    return {'status': status, 'ms': elapsed_ms, **{field: result[field] for field in DECISION_FIELDS}}
+
+
+def _recorded_decision(endpoint, response):
+    if endpoint == 'create-loan':
+        return {
+            'approval': response.get('loan_approved'),
+            'monthly_installment': response.get('monthly_installment'),
+        }
+    return {field: response.get(field) for field in DECISION_FIELDS}
+
+
+def replay_entry(entry, today=None):
+    """Decide one logged request under the baseline and candidate rules of this process."""
+    number, record = entry
+    endpoint = record.get('endpoint')
+    body = record.get('request') or {}
+    row = {'line': number, 'endpoint': endpoint, 'customer_id': body.get('customer_id')}
+
+    if endpoint not in ENDPOINTS:
+        return {**row, 'status': 400, 'error': f"Unsupported endpoint {endpoint!r}."}
+    if not all(body.get(field) for field in ('customer_id', 'loan_amount', 'interest_rate', 'tenure')):
+        return {**row, 'status': 400, 'error': "All fields are required."}
+
+    today = today or date.today()
+    started = time.perf_counter()
+    with replica_reads():
+        customer = Customer.objects.select_related('credit_profile').filter(id=body['customer_id']).first()
+        if customer is None:
+            return {**row, 'status': 404, 'error': "Customer not found."}
+        # Same stored profile the view reads; a stale one is recomputed without saving it
+        profile = getattr(customer, 'credit_profile', None)
+        if profile is None or profile.is_stale(today):
+            aggregates = get_loan_aggregates(customer.id, today)
+        else:
+            aggregates = profile.as_aggregates()
+    row['load_ms'] = (time.perf_counter() - started) * 1000
+
+    baseline_rules, candidate_rules = _rules
+    row['baseline'] = _decide(baseline_rules, customer, aggregates, body)
+    row['candidate'] = _decide(candidate_rules, customer, aggregates, body)
+    if endpoint == 'create-loan' and aggregates['active_debt'] > customer.approved_limit:
+        # create-loan rejects these before it computes the EMI
+        for decision in (row['baseline'], row['candidate']):
+            if decision['status'] == 200:
+                decision['monthly_installment'] = None
+    row['status'] = row['baseline']['status']
+    row['changed'] = [
+        field for field in DECISION_FIELDS
+        if row['baseline'].get(field) != row['candidate'].get(field)
+    ]
+
+    if record.get('response') is not None:
+        recorded = _recorded_decision(endpoint, record['response'])
+        row['recorded_mismatch'] = [
+            field for field, value in recorded.items() if row['baseline'].get(field) != value
+        ]
+    return row
+
+
+def _init_worker(baseline, candidate):
+    global _rules
+    _rules = (compile_rules(*baseline), compile_rules(*candidate))
+
+
+def replay_log(entries, baseline, candidate, workers=1, chunk_size=200, today=None):
+    """Yield one result row per logged request, in log order.
+
+    ``baseline`` and ``candidate`` are ``(version, rules)`` pairs. With more than one
+    worker the requests are spread over forked processes, each with its own
+    database connection.
+    """
+    if workers <= 1:
+        _init_worker(baseline, candidate)
+        for entry in entries:
+            yield replay_entry(entry, today)
+        return
+
+    # Forked workers must not share the parent's connections
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('fork'),
+        initializer=_init_worker,
+        initargs=(baseline, candidate),
+    ) as pool:
+        yield from pool.map(replay_entry, entries, repeat(today), chunksize=chunk_size)
+
+
+def _percentiles(values_ms):
+    if not values_ms:
+        return None
+    p50, p95, p99 = np.percentile(values_ms, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3)}
+
+
+def summarize(rows, elapsed):
+    decided = [row for row in rows if 'baseline' in row]
+    changed = {field: 0 for field in DECISION_FIELDS}
+    approval_flips = {'approved_to_declined': 0, 'declined_to_approved': 0}
+    for row in decided:
+        for field in row['changed']:
+            changed[field] += 1
+        if 'approval' in row['changed']:
+            key = 'approved_to_declined' if row['baseline'].get('approval') else 'declined_to_approved'
+            approval_flips[key] += 1
+
+    load_ms = [row['load_ms'] for row in decided]
+    recorded = [row for row in decided if 'recorded_mismatch' in row]
+    return {
+        'requests': len(rows),
+        'decided': len(decided),
+        'rejected': {
+            str(status): sum(1 for row in rows if row['status'] == status)
+            for status in sorted({row['status'] for row in rows if row['status'] != 200})
+        },
+        'changed': changed,
+        'approval_flips': approval_flips,
+        'recorded_checked': len(recorded),
+        'recorded_mismatches': sum(1 for row in recorded if row['recorded_mismatch']),
+        'requests_per_second': round(len(rows) / elapsed, 1) if elapsed else None,
+        'load': _percentiles(load_ms),
+        'baseline': _percentiles([ms + row['baseline']['ms'] for ms, row in zip(load_ms, decided)]),
+        'candidate': _percentiles([ms + row['candidate']['ms'] for ms, row in zip(load_ms, decided)]),
+    }
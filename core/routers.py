@@ -0,0 +1,116 @@
+"""Send read-only endpoints to read replicas and everything else to the primary.
+
+Reads of core's models go to a replica only inside ``replica_reads()``; every other
+code path, and framework tables such as content types, keep reading from
+``default``. A block picks one replica on entry, so all its reads see the same point
+in replication. A customer who has just written is pinned to the primary for
+``REPLICA_STICKY_SECONDS`` so they read their own writes; pins live in the
+coordination cache, which must be shared by all workers (checked by core.checks).
+"""
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+import random
+
+from django.conf import settings
+
+from .caching import coordination_cache
+
+PRIMARY = 'default'
+PIN_KEY = 'core:primary-pin:{}'
+# Lowest id of the recently bulk-registered customers; ids above it are pinned too
+NEW_CUSTOMERS_PIN_KEY = 'core:primary-pin:new-customers'
+
+# The replica alias for reads in the current replica_reads() block, else None
+_replica = ContextVar('replica', default=None)
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != PRIMARY]
+
+
+def pin_to_primary(*customer_ids):
+    # Without replicas every read is on the primary already
+    if not customer_ids or not replica_aliases():
+        return
+    coordination_cache().set_many(
+        {PIN_KEY.format(customer_id): True for customer_id in customer_ids},
+        settings.REPLICA_STICKY_SECONDS,
+    )
+
+
+def pin_new_customers(customer_ids):
+    """Pin a batch of just-created customers to the primary with a single key.
+
+    Ids only grow, so the batch is covered by pinning every id from its lowest one.
+    """
+    if not customer_ids or not replica_aliases():
+        return
+    cache = coordination_cache()
+    # Not atomic: a concurrent batch may raise the floor and unpin this one a little early
+    pinned_from = cache.get(NEW_CUSTOMERS_PIN_KEY)
+    lowest = min(customer_ids) if pinned_from is None else min(pinned_from, *customer_ids)
+    cache.set(NEW_CUSTOMERS_PIN_KEY, lowest, settings.REPLICA_STICKY_SECONDS)
+
+
+def _is_pinned(pins, customer_ids):
+    pinned_from = pins.pop(NEW_CUSTOMERS_PIN_KEY, None)
+    if pins:
+        return True
+    if pinned_from is None:
+        return False
+    for customer_id in customer_ids:
+        try:
+            if int(customer_id) >= pinned_from:
+                return True
+        except (TypeError, ValueError):
+            pass
+    return False
+
+
+def _pin_keys(customer_ids):
+    return [NEW_CUSTOMERS_PIN_KEY, *(PIN_KEY.format(customer_id) for customer_id in customer_ids)]
+
+
+@contextmanager
+def _routing(use_replica):
+    token = _replica.set(random.choice(replica_aliases()) if use_replica else None)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+@contextmanager
+def replica_reads(*customer_ids):
+    """Route reads in this block to one replica unless one of ``customer_ids`` is pinned."""
+    use_replica = bool(replica_aliases())
+    if use_replica and customer_ids:
+        use_replica = not _is_pinned(coordination_cache().get_many(_pin_keys(customer_ids)), customer_ids)
+    with _routing(use_replica):
+        yield
+
+
+@asynccontextmanager
+async def areplica_reads(*customer_ids):
+    use_replica = bool(replica_aliases())
+    if use_replica and customer_ids:
+        use_replica = not _is_pinned(await coordination_cache().aget_many(_pin_keys(customer_ids)), customer_ids)
+    with _routing(use_replica):
+        yield
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is not None and model._meta.app_label == 'core':
+            return replica
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY
@@ -0,0 +1,195 @@
+"""Versioned decision rules: credit-score weights and interest-rate bands.
+
+The active ``DecisionRuleSet`` is compiled once into a ``CompiledRules`` and kept
+per process. Requests only read the compiled copy; the database is asked for the
+active version at most every ``DECISION_RULES_CHECK_SECONDS``, and a new version
+is loaded and compiled when it changes. With no rule set stored, ``DEFAULT_RULES``
+apply as version 0.
+"""
+from bisect import bisect_left
+import logging
+import math
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+import numpy as np
+
+from .models import DecisionRuleSet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES = {
+    'on_time_loans': {'weight': 30},
+    'total_loans': {'weight': 2, 'cap': 10},
+    'current_year_loans': {'weight': 3, 'cap': 5},
+    'approved_volume': {'weight': 3, 'cap': 10, 'unit': 1000000},
+    'max_score': 100,
+    # Scores above a band's floor get loans at min_rate or more; at or below every band, no loan
+    'rate_bands': [
+        {'above': 50, 'min_rate': None},
+        {'above': 30, 'min_rate': 12},
+        {'above': 10, 'min_rate': 16},
+    ],
+}
+
+
+def _number(rules, *path, integer=False, optional=False):
+    """The number at ``path`` in ``rules``; raises ``ValueError`` naming the field."""
+    name = path[0] + ''.join(f'[{key}]' if isinstance(key, int) else f'.{key}' for key in path[1:])
+    value = rules
+    try:
+        for key in path:
+            value = value[key]
+    except (KeyError, IndexError, TypeError):
+        raise ValueError(f"Malformed decision rules: {name} is missing")
+    if value is None and optional:
+        return None
+
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Malformed decision rules: {name} must be a number, not {value!r}")
+    if not math.isfinite(number) or number < 0:
+        raise ValueError(f"Malformed decision rules: {name} must be finite and not negative, not {value!r}")
+    if integer:
+        if not number.is_integer():
+            raise ValueError(f"Malformed decision rules: {name} must be a whole number, not {value!r}")
+        return int(number)
+    return number
+
+
+class CompiledRules:
+    """A rule set flattened into attributes and sorted band arrays for per-request use."""
+
+    def __init__(self, version, rules):
+        self.version = version
+        self.on_time_weight = _number(rules, 'on_time_loans', 'weight')
+        self.loans_weight = _number(rules, 'total_loans', 'weight')
+        self.loans_cap = _number(rules, 'total_loans', 'cap')
+        self.current_year_weight = _number(rules, 'current_year_loans', 'weight')
+        self.current_year_cap = _number(rules, 'current_year_loans', 'cap')
+        self.volume_weight = _number(rules, 'approved_volume', 'weight')
+        self.volume_cap = _number(rules, 'approved_volume', 'cap')
+        self.volume_unit = _number(rules, 'approved_volume', 'unit')
+        if not self.volume_unit:
+            raise ValueError("Malformed decision rules: approved_volume.unit must be above 0")
+        self.max_score = _number(rules, 'max_score', integer=True)
+
+        if not isinstance(rules.get('rate_bands'), list):
+            raise ValueError("Malformed decision rules: rate_bands must be a list")
+        bands = []
+        for index in range(len(rules['rate_bands'])):
+            above = _number(rules, 'rate_bands', index, 'above')
+            bands.append((above, _number(rules, 'rate_bands', index, 'min_rate', optional=True)))
+        bands.sort(key=lambda band: band[0])
+        # Band i covers scores in (floors[i], floors[i + 1]]; index 0 is "no band"
+        self.floors = [above for above, _ in bands]
+        self.min_rates = [-math.inf if min_rate is None else min_rate for _, min_rate in bands]
+        self._floor_array = np.array(self.floors)
+        self._rate_array = np.array([np.nan, *self.min_rates])
+
+    def credit_score(self, aggregates, approved_limit):
+        if aggregates['active_debt'] > approved_limit:
+            return 0
+
+        total_loans = aggregates['total_loans']
+
+        score = 0
+        score += (aggregates['on_time_loans'] / total_loans * self.on_time_weight) if total_loans else 0
+        score += min(total_loans, self.loans_cap) * self.loans_weight
+        score += min(aggregates['current_year_loans'], self.current_year_cap) * self.current_year_weight
+        score += min(aggregates['approved_volume'] / self.volume_unit, self.volume_cap) * self.volume_weight
+        return min(self.max_score, math.floor(score))
+
+    def credit_scores(self, aggregates, approved_limits):
+        total_loans = aggregates['total_loans']
+        on_time_ratio = np.divide(
+            aggregates['on_time_loans'],
+            total_loans,
+            out=np.zeros(len(total_loans)),
+            where=total_loans > 0,
+        )
+
+        score = on_time_ratio * self.on_time_weight
+        score += np.minimum(total_loans, self.loans_cap) * self.loans_weight
+        score += np.minimum(aggregates['current_year_loans'], self.current_year_cap) * self.current_year_weight
+        score += np.minimum(aggregates['approved_volume'] / self.volume_unit, self.volume_cap) * self.volume_weight
+        score = np.minimum(self.max_score, np.floor(score))
+        return np.where(aggregates['active_debt'] > approved_limits, 0, score)
+
+    def approval(self, credit_score, interest_rate):
+        band = bisect_left(self.floors, credit_score)
+        if band == 0:
+            return False, None
+        min_rate = self.min_rates[band - 1]
+        return interest_rate >= min_rate, max(interest_rate, min_rate)
+
+    def approvals(self, credit_scores, interest_rates):
+        min_rates = self._rate_array[np.searchsorted(self._floor_array, credit_scores, side='left')]
+        banded = ~np.isnan(min_rates)
+        approval = banded & (interest_rates >= np.where(banded, min_rates, np.inf))
+        corrected = np.where(banded, np.maximum(interest_rates, min_rates), np.nan)
+        return approval, corrected
+
+    def score_band_labels(self):
+        """Labels for the score ranges between band floors, lowest first."""
+        edges = [f"{floor:g}" for floor in self.floors]
+        middle = [f"{low}_to_{high}" for low, high in zip(edges, edges[1:])]
+        return [f"up_to_{edges[0]}", *middle, f"above_{edges[-1]}"]
+
+
+def compile_rules(version, rules):
+    """Compile ``rules``; raises ``ValueError`` naming the first problem found."""
+    if not isinstance(rules, dict):
+        raise ValueError("Malformed decision rules: expected a JSON object")
+    compiled = CompiledRules(version, rules)
+    if not compiled.floors:
+        raise ValueError("Malformed decision rules: at least one rate band is required")
+    if len(set(compiled.floors)) != len(compiled.floors):
+        raise ValueError("Malformed decision rules: rate band floors must be distinct")
+    return compiled
+
+
+DEFAULT_COMPILED = compile_rules(0, DEFAULT_RULES)
+
+_compiled = DEFAULT_COMPILED
+_checked_at = None
+_lock = threading.Lock()
+
+
+def reload_rules():
+    """Check the active version now instead of waiting for the check interval."""
+    global _compiled, _checked_at
+
+    with _lock:
+        active = DecisionRuleSet.objects.filter(is_active=True).order_by('-version')
+        version = active.values_list('version', flat=True).first()
+        if version is None:
+            _compiled = DEFAULT_COMPILED
+        elif version != _compiled.version:
+            try:
+                _compiled = compile_rules(version, active.values_list('rules', flat=True).first())
+                logger.info("Loaded decision rules v%s", version)
+            except ValueError:
+                # Keep deciding with the rules already loaded rather than failing requests
+                logger.exception("Decision rules v%s failed to compile", version)
+        _checked_at = time.monotonic()
+
+
+def _needs_check():
+    return _checked_at is None or time.monotonic() - _checked_at >= settings.DECISION_RULES_CHECK_SECONDS
+
+
+def active_rules():
+    """The compiled active rule set, reloaded when its version has changed."""
+    if _needs_check():
+        reload_rules()
+    return _compiled
+
+
+async def aactive_rules():
+    if _needs_check():
+        await sync_to_async(reload_rules)()
+    return _compiled
@@ -0,0 +1,217 @@
+from datetime import date
+from functools import lru_cache
+import math
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import Customer, CustomerCreditProfile, Loan, LoanHistory
+from .routers import PRIMARY
+from .rules import active_rules
+
+
+def _aggregate_expressions(today):
+    active = Q(end_date__gte=today)
+    zero = Value(0.0, output_field=FloatField())
+
+    return {
+        'total_loans': Count('id'),
+        'on_time_loans': Count('id', filter=Q(emis_paid_on_time=True)),
+        'current_year_loans': Count('id', filter=Q(start_date__year=today.year)),
+        'approved_volume': Coalesce(Sum('loan_amount'), zero),
+        'active_debt': Coalesce(Sum('loan_amount', filter=active), zero),
+        'active_emis': Coalesce(Sum('monthly_installment', filter=active), zero),
+        'next_expiry': Min('end_date', filter=active),
+    }
+
+
+def _add_history(aggregates, history):
+    """Fold a customer's archived loans into aggregates computed over the ``Loan`` table."""
+    if history is not None:
+        for field in LoanHistory.COUNTER_FIELDS:
+            aggregates[field] = aggregates.get(field, 0) + getattr(history, field)
+    return aggregates
+
+
+def get_loan_aggregates(customer_id, today=None):
+    """Collect every credit-score input for a customer, archived loans included."""
+    today = today or date.today()
+    aggregates = Loan.objects.filter(customer_id=customer_id).aggregate(
+        **_aggregate_expressions(today)
+    )
+    return _add_history(aggregates, LoanHistory.objects.filter(customer_id=customer_id).first())
+
+
+def rebuild_credit_profiles(customer_ids, today=None):
+    """Recompute and upsert the credit profiles of ``customer_ids`` from the loan table."""
+    today = today or date.today()
+
+    with transaction.atomic():
+        # Wait for in-flight loan creations, which update profiles under the same lock
+        list(
+            Customer.objects.select_for_update()
+            .filter(id__in=customer_ids)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        rows = (
+            Loan.objects.using(PRIMARY)
+            .filter(customer_id__in=customer_ids)
+            .values('customer_id')
+            .annotate(**_aggregate_expressions(today))
+        )
+        aggregates = {row.pop('customer_id'): row for row in rows}
+        histories = LoanHistory.objects.using(PRIMARY).in_bulk(customer_ids)
+
+        profiles = [
+            CustomerCreditProfile(
+                customer_id=customer_id,
+                current_year=today.year,
+                refreshed_on=today,
+                **_add_history(aggregates.get(customer_id, {}), histories.get(customer_id)),
+            )
+            for customer_id in customer_ids
+        ]
+        CustomerCreditProfile.objects.bulk_create(
+            profiles,
+            update_conflicts=True,
+            unique_fields=['customer'],
+            update_fields=[
+                *CustomerCreditProfile.SCORE_FIELDS,
+                'current_year',
+                'next_expiry',
+                'refreshed_on',
+            ],
+        )
+    return profiles
+
+
+def get_credit_profile(customer_id, today=None):
+    """Read the stored credit profile, rebuilding it only when missing or stale."""
+    today = today or date.today()
+    profile = CustomerCreditProfile.objects.filter(customer_id=customer_id).first()
+    if profile is None or profile.is_stale(today):
+        profile = rebuild_credit_profiles([customer_id], today)[0]
+    return profile
+
+
+def get_credit_profiles(customers, today=None):
+    """Map customer id to a fresh profile for customers loaded with ``credit_profile``.
+
+    Missing or stale profiles are rebuilt together in one aggregate query.
+    """
+    today = today or date.today()
+    profiles = {}
+    stale_ids = []
+    for customer in customers:
+        profile = getattr(customer, 'credit_profile', None)
+        if profile is None or profile.is_stale(today):
+            stale_ids.append(customer.id)
+        else:
+            profiles[customer.id] = profile
+
+    if stale_ids:
+        for profile in rebuild_credit_profiles(stale_ids, today):
+            profiles[profile.customer_id] = profile
+    return profiles
+
+
+async def aget_credit_profiles(customers, today=None):
+    """Async ``get_credit_profiles``; only a rebuild leaves the event loop."""
+    today = today or date.today()
+    profiles = {}
+    stale_ids = []
+    for customer in customers:
+        profile = getattr(customer, 'credit_profile', None)
+        if profile is None or profile.is_stale(today):
+            stale_ids.append(customer.id)
+        else:
+            profiles[customer.id] = profile
+
+    if stale_ids:
+        for profile in await sync_to_async(rebuild_credit_profiles)(stale_ids, today):
+            profiles[profile.customer_id] = profile
+    return profiles
+
+
+def record_new_loan(profile, loan, today=None):
+    """Fold a freshly created loan into ``profile``; call inside the loan's transaction."""
+    today = today or date.today()
+    updates = {
+        'total_loans': F('total_loans') + 1,
+        'approved_volume': F('approved_volume') + loan.loan_amount,
+    }
+    if loan.emis_paid_on_time:
+        updates['on_time_loans'] = F('on_time_loans') + 1
+    if loan.start_date.year == profile.current_year:
+        updates['current_year_loans'] = F('current_year_loans') + 1
+    if loan.end_date >= today:
+        updates['active_debt'] = F('active_debt') + loan.loan_amount
+        updates['active_emis'] = F('active_emis') + loan.monthly_installment
+        if profile.next_expiry is None or loan.end_date < profile.next_expiry:
+            updates['next_expiry'] = loan.end_date
+
+    CustomerCreditProfile.objects.filter(pk=profile.pk).update(**updates)
+
+
+def calculate_credit_score(aggregates, approved_limit, rules=None):
+    return (rules or active_rules()).credit_score(aggregates, approved_limit)
+
+
+def _emi_factors(interest_rates, tenures):
+    r = interest_rates / (12 * 100)
+    growth = (1 + r) ** tenures
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return r * growth / (growth - 1)
+
+
+@lru_cache(maxsize=4096)
+def _compute_emi_factor(interest_rate, tenure):
+    # NumPy's vectorized pow can differ from math's in the last bit, so single EMIs
+    # go through the same array code as calculate_emis and the two always agree
+    factor = float(_emi_factors(np.array([interest_rate]), np.array([tenure]))[0])
+    if not math.isfinite(factor):
+        raise ValueError(f"No EMI for a {interest_rate}% rate over {tenure} months.")
+    return factor
+
+
+def emi_factor(interest_rate, tenure):
+    """EMI per unit of principal, equal to the factor ``calculate_emis`` uses."""
+    return _compute_emi_factor(float(interest_rate), int(tenure))
+
+
+def calculate_emi(loan_amount, interest_rate, tenure):
+    return float(loan_amount) * emi_factor(interest_rate, tenure)
+
+
+def max_affordable_amount(emi_headroom, interest_rate, tenure):
+    """Largest whole loan amount whose EMI fits in ``emi_headroom``."""
+    if emi_headroom <= 0:
+        return 0
+    return math.floor(emi_headroom / emi_factor(interest_rate, tenure))
+
+
+def exceeds_emi_limit(total_emis, monthly_salary):
+    return total_emis > 0.5 * monthly_salary
+
+
+def approval_for_score(credit_score, interest_rate, rules=None):
+    """Return ``(approval, corrected_interest_rate)`` for a credit score band."""
+    return (rules or active_rules()).approval(credit_score, float(interest_rate))
+
+
+def calculate_credit_scores(aggregates, approved_limits, rules=None):
+    """Vectorized ``calculate_credit_score`` over arrays keyed like the aggregates."""
+    return (rules or active_rules()).credit_scores(aggregates, approved_limits)
+
+
+def calculate_emis(loan_amounts, interest_rates, tenures):
+    return loan_amounts * _emi_factors(interest_rates, tenures)
+
+
+def approval_for_scores(credit_scores, interest_rates, rules=None):
+    """Vectorized ``approval_for_score``; a NaN corrected rate stands for ``None``."""
+    return (rules or active_rules()).approvals(credit_scores, interest_rates)
@@ -0,0 +1,28 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import invalidate_customers, invalidate_loans
+from .middleware import install_query_recorder
+from .models import Customer, Loan
+from .routers import pin_to_primary
+
+
+@receiver([post_save, post_delete], sender=Loan)
+def invalidate_loan_cache(sender, instance, created=False, **kwargs):
+    # New loans are dropped from the caches by the loan.created outbox handler, after commit
+    if not created:
+        invalidate_loans([instance.id], [instance.customer_id])
+    pin_to_primary(instance.customer_id)
+
+
+@receiver([post_save, post_delete], sender=Customer)
+def invalidate_customer_cache(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_customers([instance.id])
+    pin_to_primary(instance.id)
+
+
+@receiver(connection_created)
+def record_request_queries(sender, connection, **kwargs):
+    install_query_recorder(connection)
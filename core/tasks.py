@@ -0,0 +1,60 @@
+from datetime import date
+
+from celery import shared_task
+from django.db.models import Q
+
+from .archive import archive_matured_loans
+from .idempotency import purge_expired_keys
+from .models import Customer
+from .outbox import process_outbox
+from .portfolio import build_portfolio_snapshot
+from .reconciliation import reconcile_current_debt
+from .scoring import rebuild_credit_profiles
+
+
+@shared_task
+def refresh_credit_profiles(chunk_size=1000):
+    """Rebuild profiles that are missing, from a past year, or hold an expired loan."""
+    today = date.today()
+    stale = Customer.objects.filter(
+        Q(credit_profile__isnull=True)
+        | ~Q(credit_profile__current_year=today.year)
+        | Q(credit_profile__next_expiry__lt=today)
+    ).order_by('id').values_list('id', flat=True)
+
+    refreshed = 0
+    last_id = 0
+    while True:
+        chunk = list(stale.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        rebuild_credit_profiles(chunk, today)
+        refreshed += len(chunk)
+        last_id = chunk[-1]
+    return refreshed
+
+
+@shared_task
+def reconcile_customer_debt(chunk_size=10000):
+    """Correct current_debt drift, e.g. from loans that have passed their end date."""
+    return reconcile_current_debt(chunk_size)
+
+
+@shared_task
+def refresh_portfolio_snapshot(chunk_size=5000):
+    return build_portfolio_snapshot(chunk_size=chunk_size).pk
+
+
+@shared_task
+def drain_outbox(batch_size=500):
+    return process_outbox(batch_size)
+
+
+@shared_task
+def purge_idempotency_keys():
+    return purge_expired_keys()
+
+
+@shared_task
+def archive_loans(batch_size=5000):
+    return archive_matured_loans(batch_size)
@@ -1,3 +1,1492 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time as clock_time, timezone as dt_timezone
+from decimal import Decimal
+import bisect
+import copy
+import io
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
 
-# Create your tests here.
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management import call_command
+from django.db import connection, connections
+from django.core.cache import cache
+import numpy as np
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.test import AsyncClient, Client, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .archive import archive_matured_loans
+from .management.commands.publish_rules import Command as PublishRulesCommand
+from .caching import CUSTOMER_LOANS_KEY, LOAN_DETAIL_KEY, coordination_cache, timeout_until_midnight
+from .checks import check_rate_limit_cache, check_replica_pin_cache, check_shared_cache
+from .metrics import render_prometheus
+from .middleware import RequestMetricsMiddleware
+from .renderers import ORJSONRenderer
+from .models import (
+    Customer,
+    CustomerCreditProfile,
+    DecisionRuleSet,
+    IdempotencyKey,
+    Loan,
+    LoanArchive,
+    LoanHistory,
+    OutboxEvent,
+    PortfolioSnapshot,
+)
+from .outbox import HANDLERS, process_outbox
+from .portfolio import build_portfolio_snapshot
+from .ratelimit import BUCKET_KEY, bucket_for, take_token
+from .reconciliation import reconcile_current_debt
+from .replay import read_log, replay_log, summarize
+from .routers import NEW_CUSTOMERS_PIN_KEY, PIN_KEY, PrimaryReplicaRouter, replica_reads
+from .rules import DEFAULT_COMPILED, DEFAULT_RULES, active_rules, compile_rules, reload_rules
+from .scoring import (
+    approval_for_score,
+    approval_for_scores,
+    calculate_credit_score,
+    calculate_credit_scores,
+    calculate_emi,
+    calculate_emis,
+    get_loan_aggregates,
+    rebuild_credit_profiles,
+)
+
+LOCAL_CACHE = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+DATABASE_CACHE = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'core_cache'}
+REDIS_CACHE = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'}
+TEST_REDIS_URL = os.environ.get('TEST_REDIS_URL')
+
+
+def create_customer(**fields):
+    defaults = {
+        'first_name': 'Test',
+        'last_name': 'Customer',
+        'age': 30,
+        'phone_number': 9000000000,
+        'monthly_salary': 1000000,
+        'approved_limit': 1000000,
+    }
+    defaults.update(fields)
+    return Customer.objects.create(**defaults)
+
+
+def create_closed_loans(customer, count, loan_amount=1000000):
+    # Closed loans lift the credit score without counting towards current debt
+    start_date = date.today() - relativedelta(years=5)
+    for _ in range(count):
+        Loan.objects.create(
+            customer=customer,
+            loan_amount=loan_amount,
+            tenure=12,
+            interest_rate=10,
+            monthly_installment=1000,
+            emis_paid_on_time=True,
+            start_date=start_date,
+            end_date=start_date + relativedelta(months=12),
+        )
+
+
+def create_active_loan(customer, loan_amount, monthly_installment=1000):
+    return Loan.objects.create(
+        customer=customer,
+        loan_amount=loan_amount,
+        tenure=12,
+        interest_rate=10,
+        monthly_installment=monthly_installment,
+        emis_paid_on_time=True,
+        start_date=date.today(),
+        end_date=date.today() + relativedelta(months=12),
+    )
+
+
+@override_settings(RATE_LIMITS={})
+class CreditProfileTests(TestCase):
+    offer = {'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12}
+
+    def setUp(self):
+        self.customer = create_customer()
+        create_closed_loans(self.customer, 10)
+        active_rules()
+
+    def test_check_eligibility_reads_customer_and_profile_at_once(self):
+        rebuild_credit_profiles([self.customer.id])
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                '/check-eligibility', {'customer_id': self.customer.id, **self.offer}, content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_create_loan_keeps_profile_equal_to_a_rebuild(self):
+        for _ in range(2):
+            response = self.client.post(
+                '/create-loan', {'customer_id': self.customer.id, **self.offer}, content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 201)
+
+        profile = CustomerCreditProfile.objects.get(customer=self.customer)
+        rebuilt = rebuild_credit_profiles([self.customer.id])[0]
+        for field in (*CustomerCreditProfile.SCORE_FIELDS, 'current_year', 'next_expiry'):
+            self.assertEqual(getattr(profile, field), getattr(rebuilt, field), field)
+
+    def test_profile_goes_stale_on_new_year_and_expiry(self):
+        today = date(2026, 6, 1)
+        profile = CustomerCreditProfile(current_year=2026, next_expiry=date(2026, 9, 1), refreshed_on=today)
+
+        self.assertFalse(profile.is_stale(today))
+        self.assertFalse(profile.is_stale(date(2026, 9, 1)))
+        self.assertTrue(profile.is_stale(date(2026, 9, 2)))
+        profile.next_expiry = None
+        self.assertTrue(profile.is_stale(date(2027, 1, 1)))
+
+
+@override_settings(RATE_LIMITS={})
+class LoanQuoteTests(TestCase):
+    def check(self, customer, loan_amount, interest_rate, tenure):
+        return self.client.post('/check-eligibility', {
+            'customer_id': customer.id, 'loan_amount': loan_amount, 'interest_rate': interest_rate, 'tenure': tenure,
+        }, content_type='application/json').json()['approval']
+
+    def test_quoted_amount_is_the_largest_approved_one(self):
+        customer = create_customer(monthly_salary=83337)
+        create_closed_loans(customer, 10)
+        Loan.objects.create(
+            customer=customer, loan_amount=200000, tenure=24, interest_rate=11,
+            monthly_installment=9321.5, emis_paid_on_time=True, start_date=date.today(),
+        )
+
+        for interest_rate in (10.5, 13.25):
+            response = self.client.post('/loan-quote', {
+                'customer_id': customer.id, 'interest_rate': interest_rate, 'tenures': [6, 18, 37, 120],
+            }, content_type='application/json').json()
+            for quote in response['quotes']:
+                amount, tenure = quote['max_loan_amount'], quote['tenure']
+                self.assertTrue(self.check(customer, amount, interest_rate, tenure), (amount, tenure))
+                self.assertFalse(self.check(customer, amount + 1, interest_rate, tenure), (amount, tenure))
+
+    def test_tenures_must_be_a_list_of_whole_numbers(self):
+        customer = create_customer()
+
+        for tenures in ['12', 12, [12, '24'], [12.5], [True], {'tenure': 12}, list(range(1, 13))]:
+            with self.subTest(tenures=tenures):
+                response = self.client.post('/loan-quote', {
+                    'customer_id': customer.id, 'interest_rate': 10, 'tenures': tenures,
+                }, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"error": "tenures must be a list of at most 11 whole numbers."})
+
+    def test_listed_and_default_tenures_are_quoted(self):
+        customer = create_customer()
+
+        for tenures, expected in [([12], [12]), ([6, 120], [6, 120]), (None, [6, 12, 18, 24, 36, 48, 60, 72, 84, 96, 120])]:
+            with self.subTest(tenures=tenures):
+                data = {'customer_id': customer.id, 'interest_rate': 10}
+                if tenures is not None:
+                    data['tenures'] = tenures
+                response = self.client.post('/loan-quote', data, content_type='application/json')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([quote['tenure'] for quote in response.json()['quotes']], expected)
+
+    def test_batch_and_single_emis_agree(self):
+        rates = np.repeat(np.arange(4, 121) / 4, 36)
+        tenures = np.tile(np.arange(1, 361, 10), 117)
+        amounts = np.random.default_rng(0).integers(1000, 10000000, len(rates)).astype(float)
+
+        single = [calculate_emi(*args) for args in zip(amounts, rates, tenures)]
+        self.assertEqual(calculate_emis(amounts, rates, tenures).tolist(), single)
+
+
+@override_settings(RATE_LIMITS={})
+class CheckEligibilityBatchTests(TestCase):
+    def test_results_match_single_checks(self):
+        seasoned = create_customer(phone_number=9000000001)
+        create_closed_loans(seasoned, 10)
+        fair = create_customer(phone_number=9000000002)
+        create_closed_loans(fair, 3, loan_amount=100000)
+        late = create_customer(phone_number=9000000003)
+        create_closed_loans(late, 8, loan_amount=100000)
+        late.loans.update(emis_paid_on_time=False)
+        new = create_customer(phone_number=9000000004)
+        over_debt = create_customer(phone_number=9000000005)
+        create_closed_loans(over_debt, 10)
+        create_active_loan(over_debt, 2000000)
+        stretched = create_customer(phone_number=9000000006, monthly_salary=100000)
+        create_closed_loans(stretched, 10)
+        create_active_loan(stretched, 500000, monthly_installment=45000)
+
+        customers = [seasoned, fair, late, new, over_debt, stretched]
+        rules = active_rules()
+        bands = {
+            bisect.bisect_left(rules.floors, calculate_credit_score(get_loan_aggregates(customer.id), customer.approved_limit))
+            for customer in customers
+        }
+        self.assertEqual(bands, set(range(len(rules.floors) + 1)))
+
+        offers = [
+            {'customer_id': customer.id, 'loan_amount': 100000, 'interest_rate': interest_rate, 'tenure': 12}
+            for customer in customers for interest_rate in (8, 13.5, 20)
+        ]
+        offers += [
+            {'customer_id': seasoned.id, 'loan_amount': '250000', 'interest_rate': '11.25', 'tenure': '24'},
+            {'customer_id': 999999, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12},
+            {'customer_id': 999999, 'loan_amount': 'lots', 'interest_rate': 10, 'tenure': 12},
+            {'customer_id': seasoned.id, 'loan_amount': 'lots', 'interest_rate': 10, 'tenure': 12},
+            {'customer_id': seasoned.id, 'loan_amount': 100000, 'interest_rate': 10},
+        ]
+
+        response = self.client.post('/check-eligibility/batch', offers, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        for offer, result in zip(offers, response.json(), strict=True):
+            with self.subTest(offer=offer):
+                single = self.client.post('/check-eligibility', offer, content_type='application/json')
+                self.assertEqual(result.pop('status', 200), single.status_code)
+                self.assertEqual(result, single.json())
+
+    def test_oversized_batch_is_rejected_before_any_query(self):
+        offers = [{'customer_id': 1, 'loan_amount': 1000, 'interest_rate': 10, 'tenure': 6}] * 10001
+
+        with self.assertNumQueries(0):
+            response = self.client.post('/check-eligibility/batch', offers, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"error": "At most 10000 requests per batch."})
+
+
+class ORJSONRendererTests(TestCase):
+    def render(self, data):
+        return json.loads(ORJSONRenderer().render(data))
+
+    def test_non_finite_floats_render_as_null(self):
+        data = {
+            'nan': math.nan, 'inf': math.inf, 'negative_inf': -math.inf,
+            'numpy_nan': np.float64('nan'), 'float32_inf': np.float32('inf'),
+            'array': np.array([1.5, np.nan, np.inf]),
+        }
+        self.assertEqual(self.render(data), {
+            'nan': None, 'inf': None, 'negative_inf': None,
+            'numpy_nan': None, 'float32_inf': None, 'array': [1.5, None, None],
+        })
+
+    def test_values_match_drf_json_renderer(self):
+        data = {
+            'date': date(2024, 2, 29),
+            'datetime': datetime(2024, 2, 29, 13, 5, 9, 123456),
+            'aware_datetime': datetime(2024, 2, 29, 13, 5, 9, 123456, tzinfo=dt_timezone.utc),
+            'time': clock_time(13, 5, 9, 120),
+            'decimal': Decimal('10.50'),
+            'int64': np.int64(2 ** 40),
+            'float64': np.float64(0.1),
+            'bool': np.bool_(True),
+            'array': np.arange(6, dtype=np.int32).reshape(2, 3),
+            'strided_array': np.arange(10.0)[::3],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_float32_keeps_its_value(self):
+        value = np.float32(0.1)
+        self.assertEqual(np.float32(self.render({'value': value})['value']), value)
+
+    @override_settings(RATE_LIMITS={})
+    def test_loan_views_match_drf_json_renderer(self):
+        customer = create_customer()
+        loan = create_active_loan(customer, 123456.78, monthly_installment=10973.33)
+        create_active_loan(customer, 5000)
+
+        for path in [f'/view-loans/{customer.id}', f'/view-loan/{loan.id}']:
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(response.data)))
+
+
+@override_settings(RATE_LIMITS={})
+class LoanCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = create_customer()
+        create_closed_loans(self.customer, 10)
+
+    def test_saving_a_loan_drops_its_cached_detail(self):
+        loan = Loan.objects.filter(customer=self.customer).first()
+        self.client.get(f'/view-loan/{loan.id}')
+        self.assertIsNotNone(cache.get(LOAN_DETAIL_KEY.format(loan.id)))
+
+        loan.interest_rate = 13
+        loan.save()
+        self.assertIsNone(cache.get(LOAN_DETAIL_KEY.format(loan.id)))
+        self.assertEqual(self.client.get(f'/view-loan/{loan.id}').json()['interest_rate'], 13)
+
+    def test_new_loan_drops_the_cached_loan_list(self):
+        self.assertEqual(self.client.get(f'/view-loans/{self.customer.id}').json(), [])
+
+        response = self.client.post('/create-loan', {
+            'customer_id': self.customer.id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12,
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(process_outbox(), 1)
+
+        loans = self.client.get(f'/view-loans/{self.customer.id}').json()
+        self.assertEqual([loan['loan_id'] for loan in loans], [response.json()['loan_id']])
+
+    @override_settings(LOAN_CACHE_TIMEOUT=600)
+    def test_loan_list_expires_at_midnight(self):
+        self.assertEqual(timeout_until_midnight(datetime(2026, 3, 1, 12, 0)), 600)
+        self.assertEqual(timeout_until_midnight(datetime(2026, 3, 1, 23, 59, 30)), 30)
+
+    def test_local_and_database_caches_fail_the_deploy_check(self):
+        for backend in [LOCAL_CACHE, DATABASE_CACHE]:
+            with override_settings(CACHES={'default': backend, 'coordination': REDIS_CACHE}):
+                self.assertEqual([error.id for error in check_shared_cache(None)], ['core.E001'])
+            with override_settings(CACHES={'default': REDIS_CACHE, 'coordination': backend}):
+                self.assertEqual([error.id for error in check_shared_cache(None)], ['core.E001'])
+        with override_settings(CACHES={'default': REDIS_CACHE, 'coordination': REDIS_CACHE}):
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_cached_loans_do_not_evict_rate_limits(self):
+        coordination_cache().clear()
+        key = BUCKET_KEY.format('check-eligibility', 1, '127.0.0.1')
+        self.assertIsNone(take_token(key, 1, 0.1))
+        self.assertIsNotNone(take_token(key, 1, 0.1))
+
+        # More entries than the default cache holds, so it culls
+        cache.set_many({LOAN_DETAIL_KEY.format(n): {} for n in range(1000)})
+        self.assertIsNotNone(take_token(key, 1, 0.1))
+
+
+class CustomerLoanPagingTests(TestCase):
+    def setUp(self):
+        self.customer = create_customer()
+        create_closed_loans(self.customer, 2)
+        start_date = date.today()
+        self.active_ids = [
+            Loan.objects.create(
+                customer=self.customer,
+                loan_amount=10000 * (n + 1),
+                tenure=12,
+                interest_rate=10,
+                monthly_installment=1000,
+                emis_paid_on_time=True,
+                start_date=start_date,
+            ).id
+            for n in range(7)
+        ]
+
+    def test_cursor_pages_cover_every_active_loan_once(self):
+        seen = []
+        cursor = 0
+        while cursor is not None:
+            page = self.client.get(f'/view-loans/{self.customer.id}', {'limit': 3, 'cursor': cursor}).json()
+            self.assertLessEqual(len(page['results']), 3)
+            seen += [loan['loan_id'] for loan in page['results']]
+            cursor = page['next_cursor']
+        self.assertEqual(seen, self.active_ids)
+
+    def test_stream_matches_the_full_list(self):
+        response = self.client.get(f'/view-loans/{self.customer.id}', {'stream': 'true'})
+        streamed = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(streamed, self.client.get(f'/view-loans/{self.customer.id}').json())
+        self.assertEqual([loan['loan_id'] for loan in streamed], self.active_ids)
+
+    def test_unknown_customer_and_bad_cursor(self):
+        self.assertEqual(self.client.get('/view-loans/999999', {'stream': 'true'}).status_code, 404)
+        self.assertEqual(self.client.get(f'/view-loans/{self.customer.id}', {'cursor': 'x'}).status_code, 400)
+
+
+class ReplicaRouterTests(TestCase):
+    router = PrimaryReplicaRouter()
+
+    def setUp(self):
+        coordination_cache().clear()
+        patcher = mock.patch('core.routers.replica_aliases', return_value=['replica1', 'replica2'])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_a_block_reads_from_one_replica(self):
+        chosen = set()
+        for _ in range(50):
+            with replica_reads():
+                aliases = {
+                    self.router.db_for_read(model)
+                    for model in (Customer, CustomerCreditProfile, Loan)
+                    for _ in range(5)
+                }
+            self.assertEqual(len(aliases), 1)
+            chosen |= aliases
+        self.assertEqual(chosen, {'replica1', 'replica2'})
+
+    def test_primary_outside_blocks_for_writes_and_for_other_apps(self):
+        self.assertEqual(self.router.db_for_read(Customer), 'default')
+        with replica_reads():
+            self.assertEqual(self.router.db_for_write(Customer), 'default')
+            self.assertEqual(self.router.db_for_read(ContentType), 'default')
+
+    def test_pinned_customer_reads_from_the_primary(self):
+        coordination_cache().set(PIN_KEY.format(7), True)
+        with replica_reads(7):
+            self.assertEqual(self.router.db_for_read(Customer), 'default')
+        with replica_reads(8):
+            self.assertNotEqual(self.router.db_for_read(Customer), 'default')
+
+    def test_writes_pin_only_when_there_are_replicas(self):
+        customer = create_customer()
+        self.assertTrue(coordination_cache().get(PIN_KEY.format(customer.id)))
+
+        with mock.patch('core.routers.replica_aliases', return_value=[]):
+            coordination_cache().clear()
+            customer.save()
+            create_closed_loans(customer, 1)
+        self.assertIsNone(coordination_cache().get(PIN_KEY.format(customer.id)))
+
+    def test_replicas_need_a_shared_cache(self):
+        local = {'default': REDIS_CACHE, 'coordination': LOCAL_CACHE}
+        shared = {'default': REDIS_CACHE, 'coordination': REDIS_CACHE}
+
+        with mock.patch('core.checks.replica_aliases', return_value=['replica1']):
+            with override_settings(CACHES=local):
+                self.assertEqual([error.id for error in check_replica_pin_cache(None)], ['core.E002'])
+            with override_settings(CACHES=shared):
+                self.assertEqual(check_replica_pin_cache(None), [])
+        with mock.patch('core.checks.replica_aliases', return_value=[]), override_settings(CACHES=local):
+            self.assertEqual(check_replica_pin_cache(None), [])
+
+
+@unittest.skipUnless(
+    'replica1' in settings.DATABASES,
+    "Needs a replica1 database, e.g. DATABASE_REPLICA_HOSTS=localhost and a shared cache backend",
+)
+@override_settings(RATE_LIMITS={})
+class ReplicaDatabaseTests(TestCase):
+    """Against a real second alias; the replica never holds rows written during a test."""
+
+    # The runner sets up every alias named here, skipped classes included
+    databases = {'default', 'replica1'} if 'replica1' in settings.DATABASES else {'default'}
+
+    def setUp(self):
+        self.customer = create_customer()
+        cache.clear()
+        coordination_cache().clear()
+
+    def test_reads_in_a_block_go_to_the_replica(self):
+        with CaptureQueriesContext(connections['replica1']) as replica_queries:
+            with replica_reads():
+                self.assertFalse(Customer.objects.filter(id=self.customer.id).exists())
+            self.assertTrue(Customer.objects.filter(id=self.customer.id).exists())
+        self.assertEqual(len(replica_queries), 1)
+
+    def test_writes_in_a_block_go_to_the_primary(self):
+        with CaptureQueriesContext(connections['replica1']) as replica_queries:
+            with replica_reads():
+                customer = create_customer(phone_number=9000000001)
+        self.assertEqual(customer._state.db, 'default')
+        self.assertEqual(len(replica_queries), 0)
+        self.assertTrue(Customer.objects.using('default').filter(id=customer.id).exists())
+
+    def test_pinned_customer_reads_from_the_primary(self):
+        customer = create_customer(phone_number=9000000001)
+
+        with CaptureQueriesContext(connections['replica1']) as replica_queries:
+            with replica_reads(customer.id):
+                self.assertEqual(Customer.objects.get(id=customer.id), customer)
+        self.assertEqual(len(replica_queries), 0)
+
+    def test_view_falls_back_to_the_primary_when_the_replica_misses(self):
+        create_closed_loans(self.customer, 1)
+        loan = Loan.objects.get()
+        cache.clear()
+
+        with CaptureQueriesContext(connections['replica1']) as replica_queries:
+            response = self.client.get(f'/view-loan/{loan.id}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['loan_id'], loan.id)
+        self.assertGreater(len(replica_queries), 0)
+
+
+def metric_value(line_prefix):
+    for line in render_prometheus().splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+class RequestMetricsMiddlewareTests(TestCase):
+    def test_middleware_is_async_under_an_async_handler(self):
+        async def get_response(request):
+            return None
+
+        self.assertTrue(iscoroutinefunction(RequestMetricsMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(RequestMetricsMiddleware(lambda request: None)))
+
+    @override_settings(RATE_LIMITS={})
+    def test_sync_view_queries_are_counted(self):
+        customer = create_customer()
+        queries_sum = 'credit_api_db_queries_sum{view="check-eligibility"}'
+        queries_before = metric_value(queries_sum)
+
+        response = self.client.post('/check-eligibility', {
+            'customer_id': customer.id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12,
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(metric_value(queries_sum), queries_before)
+
+    @override_settings(ROOT_URLCONF='core.urls_async', RATE_LIMITS={})
+    async def test_async_view_queries_are_counted(self):
+        customer = await Customer.objects.acreate(
+            first_name='Test', last_name='Customer', age=30, phone_number=9000000000,
+            monthly_salary=1000000, approved_limit=1000000,
+        )
+        queries_sum = 'credit_api_db_queries_sum{view="check-eligibility"}'
+        requests_count = 'credit_api_request_duration_seconds_count{view="check-eligibility"}'
+        queries_before, requests_before = metric_value(queries_sum), metric_value(requests_count)
+
+        response = await AsyncClient().post('/check-eligibility', {
+            'customer_id': customer.id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12,
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metric_value(requests_count), requests_before + 1)
+        self.assertGreater(metric_value(queries_sum), queries_before)
+
+
+@override_settings(RATE_LIMITS={})
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = create_customer(monthly_salary=100000)
+        create_closed_loans(self.customer, 10)
+        self.loans = [create_active_loan(self.customer, 100000 * n, monthly_installment=5000) for n in (1, 2, 3)]
+        self.unscored = create_customer(phone_number=9000000001, monthly_salary=100000)
+
+    def sync_response(self, method, path, *args, **kwargs):
+        cache.clear()
+        return self.read(getattr(Client(), method)(path, *args, **kwargs))
+
+    def async_response(self, method, path, *args, **kwargs):
+        async def fetch():
+            response = await getattr(AsyncClient(), method)(path, *args, **kwargs)
+            if response.streaming:
+                return response.status_code, json.loads(b''.join([part async for part in response.streaming_content]))
+            return self.read(response)
+
+        cache.clear()
+        with override_settings(ROOT_URLCONF='core.urls_async'):
+            return async_to_sync(fetch)()
+
+    @staticmethod
+    def read(response):
+        if response.streaming:
+            return response.status_code, json.loads(b''.join(response.streaming_content))
+        return response.status_code, response.json()
+
+    def assert_same_response(self, method, path, *args, status, **kwargs):
+        with self.subTest(path=path, args=args):
+            expected = self.sync_response(method, path, *args, **kwargs)
+            self.assertEqual(expected[0], status)
+            self.assertEqual(self.async_response(method, path, *args, **kwargs), expected)
+
+    def test_loan_reads_match_the_sync_views(self):
+        self.assert_same_response('get', f'/view-loan/{self.loans[0].id}', status=200)
+        self.assert_same_response('get', '/view-loan/999999', status=404)
+
+        path = f'/view-loans/{self.customer.id}'
+        self.assert_same_response('get', path, status=200)
+        self.assert_same_response('get', path, {'stream': 'true'}, status=200)
+        self.assert_same_response('get', path, {'limit': 2}, status=200)
+        self.assert_same_response('get', path, {'limit': 2, 'cursor': self.loans[1].id}, status=200)
+        self.assert_same_response('get', path, {'limit': 'two'}, status=400)
+        self.assert_same_response('get', path, {'limit': 0}, status=400)
+        self.assert_same_response('get', '/view-loans/999999', status=404)
+
+    def test_eligibility_matches_the_sync_view(self):
+        offer = {'customer_id': self.customer.id, 'loan_amount': 100000, 'interest_rate': 10, 'tenure': 12}
+        cases = [
+            (offer, 200),
+            ({**offer, 'interest_rate': 8}, 200),
+            ({**offer, 'loan_amount': 10000000}, 200),
+            ({**offer, 'customer_id': self.unscored.id}, 200),
+            ({**offer, 'loan_amount': 'lots'}, 400),
+            ({**offer, 'tenure': None}, 400),
+            ({**offer, 'customer_id': 999999}, 404),
+            ([offer], 400),
+            ('"offer"', 400),
+            ('12', 400),
+        ]
+        for data, status in cases:
+            self.assert_same_response(
+                'post', '/check-eligibility', data, content_type='application/json', status=status
+            )
+
+    def test_malformed_json_is_rejected(self):
+        status, data = self.async_response(
+            'post', '/check-eligibility', '{"customer_id": ', content_type='application/json'
+        )
+        self.assertEqual((status, data), (400, {"error": "Malformed JSON body."}))
+
+
+@unittest.skipUnless(
+    connection.features.has_select_for_update, "Row locks need a database with SELECT ... FOR UPDATE"
+)
+@override_settings(RATE_LIMITS={})
+class ConcurrentCreateLoanTests(TransactionTestCase):
+    requests = 30
+
+    def create_loan(self, customer_id):
+        try:
+            return Client().post('/create-loan', {
+                'customer_id': customer_id,
+                'loan_amount': 100000,
+                'interest_rate': 10,
+                'tenure': 12,
+            }, content_type='application/json').status_code
+        finally:
+            connections.close_all()
+
+    def test_parallel_requests_do_not_over_approve(self):
+        customer = create_customer()
+        create_closed_loans(customer, 10)
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            statuses = list(pool.map(self.create_loan, [customer.id] * self.requests))
+        process_outbox()
+
+        # Run one at a time, loans are approved until debt first exceeds the 1,000,000 limit
+        self.assertEqual(statuses.count(201), 11)
+        self.assertEqual(statuses.count(200), self.requests - 11)
+
+        customer.refresh_from_db()
+        self.assertEqual(customer.current_debt, 1100000)
+        self.assertEqual(Loan.objects.filter(customer=customer).count(), 21)
+
+        profile = CustomerCreditProfile.objects.get(customer=customer)
+        self.assertEqual(profile.active_debt, 1100000)
+        self.assertEqual(profile.total_loans, 21)
+
+    def test_parallel_duplicates_create_one_loan(self):
+        customer = create_customer()
+        create_closed_loans(customer, 10)
+
+        def create_loan(_):
+            try:
+                response = Client(HTTP_IDEMPOTENCY_KEY='retry-1').post('/create-loan', {
+                    'customer_id': customer.id,
+                    'loan_amount': 100000,
+                    'interest_rate': 10,
+                    'tenure': 12,
+                }, content_type='application/json')
+                return response.status_code, response.json()['loan_id']
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(create_loan, range(10)))
+
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(results[0][0], 201)
+        self.assertEqual(Loan.objects.filter(customer=customer).count(), 11)
+
+
+class IdempotencyTests(TestCase):
+    def register(self, key, phone_number=9000000001):
+        return self.client.post('/register', {
+            'first_name': 'Test',
+            'last_name': 'Customer',
+            'age': 30,
+            'phone_number': phone_number,
+            'monthly_income': 50000,
+        }, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response(self):
+        first = self.register('signup-1')
+        self.assertEqual(first.status_code, 201)
+
+        with self.assertNumQueries(1):
+            replay = self.register('signup-1')
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.json(), first.json())
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Customer.objects.count(), 1)
+
+    def test_key_reused_for_a_different_request(self):
+        self.register('signup-1')
+        self.assertEqual(self.register('signup-1', phone_number=9000000002).status_code, 422)
+
+    def test_expired_key_runs_again(self):
+        self.register('signup-1')
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+
+        self.assertEqual(self.register('signup-1').json(), {"error": "Phone number already registered."})
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 400)
+
+
+class RegisterCustomerBatchTests(TestCase):
+    def entry(self, phone_number, monthly_income=50000, **fields):
+        return {
+            'first_name': 'Test',
+            'last_name': 'Customer',
+            'age': 30,
+            'phone_number': phone_number,
+            'monthly_income': monthly_income,
+            **fields,
+        }
+
+    def register_batch(self, entries):
+        return self.client.post('/register/batch', entries, content_type='application/json')
+
+    def test_results_follow_request_order(self):
+        entries = [self.entry(9000000003), self.entry(9000000001, age=''), self.entry(9000000002)]
+        response = self.register_batch(entries)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()
+        self.assertEqual([result.get('phone_number') for result in results], [9000000003, None, 9000000002])
+        self.assertEqual(results[1], {"error": "All fields are required.", "status": 400})
+        self.assertEqual(
+            list(Customer.objects.order_by('id').values_list('phone_number', flat=True)),
+            [9000000003, 9000000002],
+        )
+
+    def test_duplicate_phone_numbers(self):
+        create_customer(phone_number=9000000001)
+        results = self.register_batch([
+            self.entry(9000000001), self.entry(9000000002), self.entry(9000000002),
+        ]).json()
+
+        self.assertEqual(results[0], {"error": "Phone number already registered.", "status": 400})
+        self.assertEqual(results[1]['phone_number'], 9000000002)
+        self.assertEqual(results[2], {"error": "Phone number appears earlier in the batch.", "status": 400})
+        self.assertEqual(Customer.objects.filter(phone_number=9000000002).count(), 1)
+
+    def test_batch_is_pinned_with_one_key(self):
+        existing = create_customer(phone_number=9000000099)
+        router = PrimaryReplicaRouter()
+        coordination_cache().clear()
+
+        with mock.patch('core.routers.replica_aliases', return_value=[]):
+            self.register_batch([self.entry(9000000001 + n) for n in range(3)])
+        self.assertIsNone(coordination_cache().get(NEW_CUSTOMERS_PIN_KEY))
+
+        with mock.patch('core.routers.replica_aliases', return_value=['replica1']):
+            results = self.register_batch([self.entry(9000000011 + n) for n in range(3)]).json()
+            new_ids = [result['customer_id'] for result in results]
+            self.assertEqual(coordination_cache().get(NEW_CUSTOMERS_PIN_KEY), min(new_ids))
+            self.assertEqual(coordination_cache().get_many([PIN_KEY.format(id) for id in new_ids]), {})
+
+            for customer_id in new_ids:
+                with replica_reads(customer_id):
+                    self.assertEqual(router.db_for_read(Customer), 'default')
+            with replica_reads(existing.id):
+                self.assertEqual(router.db_for_read(Customer), 'replica1')
+
+    def test_approved_limit_matches_single_register(self):
+        # 12500 and 37500 put 36x income exactly halfway between two lakhs
+        incomes = [12500, 37500, 50000, 51234]
+        batch = self.register_batch([
+            self.entry(9000000100 + index, income) for index, income in enumerate(incomes)
+        ]).json()
+        single = [
+            self.client.post('/register', self.entry(9000000200 + index, income), content_type='application/json').json()
+            for index, income in enumerate(incomes)
+        ]
+
+        self.assertEqual(
+            [result['approved_limit'] for result in batch],
+            [result['approved_limit'] for result in single],
+        )
+        self.assertEqual([result['approved_limit'] for result in batch], [400000, 1400000, 1800000, 1800000])
+
+
+class OutboxTests(TestCase):
+    def create_loan(self, customer):
+        return self.client.post('/create-loan', {
+            'customer_id': customer.id,
+            'loan_amount': 100000,
+            'interest_rate': 10,
+            'tenure': 12,
+        }, content_type='application/json')
+
+    def test_create_loan_records_event_for_worker(self):
+        customer = create_customer()
+        create_closed_loans(customer, 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.create_loan(customer)
+        self.assertEqual(response.status_code, 201)
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.payload, {'loan_id': response.json()['loan_id'], 'customer_id': customer.id})
+
+        customer.refresh_from_db()
+        self.assertEqual(customer.current_debt, 0)
+
+        cache.set(CUSTOMER_LOANS_KEY.format(customer.id), [])
+        self.assertEqual(process_outbox(), 1)
+        self.assertFalse(OutboxEvent.objects.exists())
+        self.assertIsNone(cache.get(CUSTOMER_LOANS_KEY.format(customer.id)))
+        customer.refresh_from_db()
+        self.assertEqual(customer.current_debt, 100000)
+
+        # Delivery is at least once, so a repeated event must not count the loan twice
+        HANDLERS['loan.created'](event.payload)
+        customer.refresh_from_db()
+        self.assertEqual(customer.current_debt, 100000)
+
+    @override_settings(OUTBOX_EAGER=True)
+    def test_eager_mode_handles_events_on_commit(self):
+        customer = create_customer()
+        create_closed_loans(customer, 10)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.create_loan(customer).status_code, 201)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_rejected_loan_records_no_event(self):
+        customer = create_customer()
+
+        self.assertEqual(self.create_loan(customer).status_code, 200)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_failing_event_is_kept_for_retry(self):
+        OutboxEvent.objects.create(topic='test.fails', payload={})
+        HANDLERS['test.fails'] = lambda payload: 1 / 0
+        self.addCleanup(HANDLERS.pop, 'test.fails')
+
+        with self.assertLogs('core.outbox', 'ERROR'):
+            self.assertEqual(process_outbox(), 0)
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertIn('ZeroDivisionError', event.last_error)
+
+
+class PortfolioSnapshotTests(TestCase):
+    def setUp(self):
+        low_ratio = create_customer(phone_number=9000000001, monthly_salary=100000)
+        create_active_loan(low_ratio, 200000, monthly_installment=15000)
+        over_limit = create_customer(phone_number=9000000002, monthly_salary=100000)
+        create_active_loan(over_limit, 300000, monthly_installment=40000)
+        create_active_loan(over_limit, 100000, monthly_installment=20000)
+        # No salary and no EMIs is not over the EMI limit; no salary with EMIs is
+        create_customer(phone_number=9000000003, monthly_salary=0)
+        no_salary = create_customer(phone_number=9000000004, monthly_salary=0)
+        create_active_loan(no_salary, 50000)
+        seasoned = create_customer(phone_number=9000000005, monthly_salary=50000)
+        create_closed_loans(seasoned, 10)
+        self.customers = [low_ratio, over_limit, no_salary, seasoned]
+
+    def expected_score_bands(self):
+        rules = active_rules()
+        counts = dict.fromkeys(rules.score_band_labels(), 0)
+        for customer in Customer.objects.all():
+            score = calculate_credit_score(get_loan_aggregates(customer.id), customer.approved_limit)
+            counts[rules.score_band_labels()[bisect.bisect_left(rules.floors, score)]] += 1
+        return counts
+
+    def test_totals_and_buckets(self):
+        snapshot = build_portfolio_snapshot()
+
+        self.assertEqual(snapshot.customers, 5)
+        self.assertEqual(snapshot.active_loans, 4)
+        self.assertEqual(snapshot.outstanding_exposure, 650000)
+        self.assertEqual(snapshot.active_emis, 76000)
+        self.assertEqual(snapshot.customers_over_emi_limit, 2)
+        self.assertEqual(snapshot.emi_to_salary, {
+            '0.0-0.1': 2, '0.1-0.2': 1, '0.2-0.3': 0, '0.3-0.4': 0, '0.4-0.5': 0,
+            '0.5-0.6': 0, '0.6-0.8': 1, '0.8-1.0': 0, '1.0+': 1,
+        })
+        self.assertEqual(snapshot.score_bands, self.expected_score_bands())
+        self.assertGreaterEqual(sum(1 for count in snapshot.score_bands.values() if count), 3)
+
+    def test_chunk_boundaries_do_not_change_the_figures(self):
+        fields = [
+            'customers', 'active_loans', 'outstanding_exposure', 'active_emis',
+            'customers_over_emi_limit', 'emi_to_salary', 'score_bands',
+        ]
+        whole = PortfolioSnapshot.objects.filter(pk=build_portfolio_snapshot(chunk_size=1000).pk).values(*fields).get()
+        for chunk_size in [1, 2, 3]:
+            with self.subTest(chunk_size=chunk_size):
+                snapshot = build_portfolio_snapshot(chunk_size=chunk_size)
+                self.assertEqual(PortfolioSnapshot.objects.filter(pk=snapshot.pk).values(*fields).get(), whole)
+
+    def test_rebuilding_a_day_updates_it_in_place(self):
+        first = build_portfolio_snapshot(today=date.today())
+        create_active_loan(self.customers[0], 100000)
+
+        second = build_portfolio_snapshot(today=date.today())
+        self.assertEqual(second.pk, first.pk)
+        self.assertEqual(PortfolioSnapshot.objects.count(), 1)
+        self.assertEqual(PortfolioSnapshot.objects.get().active_loans, 5)
+
+
+class ReconcileCurrentDebtTests(TestCase):
+    def test_drifted_customers_are_corrected(self):
+        overstated, correct, without_loans, closed_only, understated = (
+            create_customer(phone_number=9000000001 + n) for n in range(5)
+        )
+        create_active_loan(overstated, 150000.4)
+        create_active_loan(overstated, 100000)
+        create_active_loan(correct, 200000)
+        create_active_loan(understated, 120000)
+        create_closed_loans(closed_only, 1)
+        for customer, current_debt in [(overstated, 300000), (correct, 200000), (without_loans, 70000)]:
+            Customer.objects.filter(pk=customer.pk).update(current_debt=current_debt)
+
+        # Chunks of two customers, so the drift is summed across chunks
+        self.assertEqual(reconcile_current_debt(chunk_size=2), {'customers': 3, 'drift': 50000 + 70000 + 120000})
+        self.assertEqual(
+            dict(Customer.objects.values_list('id', 'current_debt')),
+            {overstated.id: 250000, correct.id: 200000, without_loans.id: 0, closed_only.id: 0, understated.id: 120000},
+        )
+        self.assertEqual(reconcile_current_debt(chunk_size=2), {'customers': 0, 'drift': 0})
+
+
+@override_settings(RATE_LIMITS={})
+class LoanScheduleTests(TestCase):
+    def setUp(self):
+        customer = create_customer()
+        # 300 months spans three of the schedule's NumPy chunks
+        self.loans = [
+            Loan.objects.create(
+                customer=customer, loan_amount=loan_amount, tenure=tenure, interest_rate=interest_rate,
+                monthly_installment=calculate_emi(loan_amount, interest_rate, tenure),
+                emis_paid_on_time=True, start_date=date(2024, 1, 31),
+            )
+            for loan_amount, interest_rate, tenure in [(100000, 10, 12), (2500000, 8.5, 300), (60000, 24, 1)]
+        ]
+
+    def schedule(self, loan, **params):
+        response = self.client.get(f'/view-loan/{loan.id}/schedule', params)
+        if response.status_code != 200:
+            return response.status_code, response.json()
+        return response.status_code, json.loads(b''.join(response.streaming_content))
+
+    def test_full_schedule_repays_the_loan(self):
+        for loan in self.loans:
+            with self.subTest(tenure=loan.tenure, interest_rate=loan.interest_rate):
+                status, data = self.schedule(loan)
+                rows = data['schedule']
+
+                self.assertEqual(status, 200)
+                self.assertEqual(len(rows), loan.tenure)
+                self.assertEqual([row['month'] for row in rows], list(range(1, loan.tenure + 1)))
+                self.assertAlmostEqual(sum(row['principal'] for row in rows), loan.loan_amount, delta=0.005 * loan.tenure)
+                self.assertEqual(rows[-1]['balance'], 0)
+                self.assertEqual(rows[0]['due_date'], '2024-02-29')
+
+    def test_windows_match_the_full_schedule(self):
+        loan = self.loans[1]
+        rows = self.schedule(loan)[1]['schedule']
+
+        for first_month, last_month in [(1, 1), (5, 17), (119, 241), (300, 300)]:
+            with self.subTest(first_month=first_month, last_month=last_month):
+                status, data = self.schedule(loan, **{'from': first_month, 'to': last_month})
+                self.assertEqual(status, 200)
+                self.assertEqual(data['schedule'], rows[first_month - 1:last_month])
+        self.assertEqual(self.schedule(loan, **{'from': 290})[1]['schedule'], rows[289:])
+        self.assertEqual(self.schedule(loan, to=3)[1]['schedule'], rows[:3])
+
+    def test_invalid_window_is_rejected(self):
+        loan = self.loans[0]
+        for params in [{'from': 'one'}, {'to': '1.5'}, {'from': 0}, {'to': 13}, {'from': 5, 'to': 4}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.schedule(loan, **params)[0], 400)
+
+    def test_unknown_loan_is_not_found(self):
+        response = self.client.get('/view-loan/999999/schedule')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"error": "Loan not found."})
+
+
+@override_settings(RATE_LIMITS={})
+class ArchiveTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = create_customer()
+        create_closed_loans(self.customer, 3)
+        Loan.objects.filter(customer=self.customer).update(emis_paid_on_time=False)
+        create_closed_loans(self.customer, 2, loan_amount=500000)
+        self.active = Loan.objects.create(
+            customer=self.customer,
+            loan_amount=100000,
+            tenure=12,
+            interest_rate=10,
+            monthly_installment=8791.59,
+            emis_paid_on_time=True,
+            start_date=date.today(),
+            end_date=date.today() + relativedelta(months=12),
+        )
+        self.matured_ids = sorted(Loan.objects.exclude(id=self.active.id).values_list('id', flat=True))
+
+    def test_aggregates_are_unchanged(self):
+        before = get_loan_aggregates(self.customer.id)
+
+        self.assertEqual(archive_matured_loans(batch_size=2), 5)
+        self.assertEqual(list(Loan.objects.values_list('id', flat=True)), [self.active.id])
+        self.assertEqual(sorted(LoanArchive.objects.values_list('id', flat=True)), self.matured_ids)
+        self.assertEqual(get_loan_aggregates(self.customer.id), before)
+
+        rebuild_credit_profiles([self.customer.id])
+        stored = CustomerCreditProfile.objects.get(customer=self.customer).as_aggregates()
+        self.assertEqual(stored, {field: before[field] for field in stored})
+
+    def test_second_run_is_a_no_op(self):
+        archive_matured_loans()
+        history = LoanHistory.objects.values(*LoanHistory.COUNTER_FIELDS).get()
+
+        self.assertEqual(archive_matured_loans(), 0)
+        self.assertEqual(LoanHistory.objects.values(*LoanHistory.COUNTER_FIELDS).get(), history)
+        self.assertEqual(LoanArchive.objects.count(), 5)
+
+    def test_archived_loans_are_still_served(self):
+        loan_id = self.matured_ids[0]
+        detail = self.client.get(f'/view-loan/{loan_id}').json()
+        schedule = b''.join(self.client.get(f'/view-loan/{loan_id}/schedule').streaming_content)
+
+        archive_matured_loans()
+        cache.clear()
+
+        self.assertEqual(self.client.get(f'/view-loan/{loan_id}').json(), detail)
+        response = self.client.get(f'/view-loan/{loan_id}/schedule')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), schedule)
+
+    def test_load_data_skips_archived_loans(self):
+        archive_matured_loans()
+        history = LoanHistory.objects.values(*LoanHistory.COUNTER_FIELDS).get()
+        loans = list(LoanArchive.objects.order_by('id')) + [self.active]
+
+        with tempfile.TemporaryDirectory() as directory:
+            customers_path = os.path.join(directory, 'customers.csv')
+            loans_path = os.path.join(directory, 'loans.csv')
+            with open(customers_path, 'w') as f:
+                f.write('customer_id,first_name,last_name,age,phone_number,monthly_salary,approved_limit\n')
+                f.write(f'{self.customer.id},Test,Customer,30,9000000000,1000000,1000000\n')
+            with open(loans_path, 'w') as f:
+                f.write(
+                    'customer_id,loan_id,loan_amount,tenure,interest_rate,monthly_payment,'
+                    'emis_paid_on_time,date_of_approval,end_date\n'
+                )
+                for loan in loans:
+                    f.write(
+                        f'{self.customer.id},{loan.id},{loan.loan_amount},{loan.tenure},{loan.interest_rate},'
+                        f'{loan.monthly_installment},{int(loan.emis_paid_on_time)},{loan.start_date},{loan.end_date}\n'
+                    )
+
+            output = io.StringIO()
+            call_command('load_data', customers=customers_path, loans=loans_path, stdout=output)
+
+        self.assertIn("Skipped 5 loans that are already archived.", output.getvalue())
+        self.assertEqual(list(Loan.objects.values_list('id', flat=True)), [self.active.id])
+        self.assertEqual(LoanHistory.objects.values(*LoanHistory.COUNTER_FIELDS).get(), history)
+
+
+class LoadDataFormatTests(TestCase):
+    testdata = os.path.join(os.path.dirname(__file__), 'testdata')
+
+    def load(self, file_format):
+        Loan.objects.all().delete()
+        Customer.objects.all().delete()
+        call_command(
+            'load_data',
+            customers=os.path.join(self.testdata, f'customer_data.{file_format}'),
+            loans=os.path.join(self.testdata, f'loan_data.{file_format}'),
+            batch_size=2,
+            stdout=io.StringIO(),
+        )
+        return (
+            list(Customer.objects.order_by('id').values_list(
+                'id', 'first_name', 'last_name', 'age', 'phone_number', 'monthly_salary', 'approved_limit', 'current_debt',
+            )),
+            list(Loan.objects.order_by('id').values_list(
+                'id', 'customer_id', 'loan_amount', 'tenure', 'interest_rate', 'monthly_installment',
+                'emis_paid_on_time', 'start_date', 'end_date',
+            )),
+        )
+
+    def test_every_format_loads_the_csv_rows(self):
+        customers, loans = self.load('csv')
+        self.assertEqual([customer[:2] for customer in customers], [(1, 'Aaron'), (2, 'Sofia'), (3, 'Rahul')])
+        # The loan for unknown customer 9 is skipped and a missing end date follows from the tenure
+        self.assertEqual([loan[0] for loan in loans], [101, 102, 103, 104])
+        self.assertEqual(loans[2][7:], (date(2024, 2, 29), date(2027, 2, 28)))
+        self.assertEqual([loan[6] for loan in loans], [True, False, True, True])
+
+        for file_format in ['parquet', 'xlsx']:
+            with self.subTest(file_format=file_format):
+                self.assertEqual(self.load(file_format), (customers, loans))
+
+
+# Refills take ten seconds, so the token counts below do not depend on timing
+@override_settings(RATE_LIMITS={'check-eligibility': {'burst': 10, 'per_second': 0.1}})
+class RateLimitTests(TransactionTestCase):
+    flood_threads = 4
+
+    def setUp(self):
+        coordination_cache().clear()
+        self.flooded = create_customer(phone_number=9000000001)
+        self.customer = create_customer(phone_number=9000000002)
+        # Admitted requests then only read, which SQLite allows from several threads
+        rebuild_credit_profiles([self.flooded.id, self.customer.id])
+
+    def check_eligibility(self, client, customer_id):
+        return client.post('/check-eligibility', {
+            'customer_id': customer_id,
+            'loan_amount': 100000,
+            'interest_rate': 10,
+            'tenure': 12,
+        }, content_type='application/json')
+
+    def flood(self, stop, throttled, statuses):
+        client = Client(REMOTE_ADDR='10.0.0.66')
+        try:
+            while not stop.is_set():
+                statuses.append(self.check_eligibility(client, self.flooded.id).status_code)
+                if statuses[-1] == 429:
+                    throttled.set()
+        finally:
+            connections.close_all()
+
+    def test_rejected_requests_skip_the_database(self):
+        client = Client(REMOTE_ADDR='10.0.0.66')
+        for _ in range(10):
+            self.assertEqual(self.check_eligibility(client, self.flooded.id).status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.check_eligibility(client, self.flooded.id)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+
+        # Other customers and other clients have their own buckets
+        self.assertEqual(self.check_eligibility(client, self.customer.id).status_code, 200)
+        self.assertEqual(self.check_eligibility(Client(REMOTE_ADDR='10.0.0.7'), self.flooded.id).status_code, 200)
+
+    def test_flood_does_not_slow_down_other_clients(self):
+        stop = threading.Event()
+        throttled = threading.Event()
+        statuses = []
+        threads = [
+            threading.Thread(target=self.flood, args=(stop, throttled, statuses))
+            for _ in range(self.flood_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            # Once the flood is being rejected, another client asks for the same customer alongside it
+            self.assertTrue(throttled.wait(10))
+            partner = Client(REMOTE_ADDR='10.0.0.7')
+            partner_statuses = []
+            latencies = []
+            for _ in range(11):
+                started = time.perf_counter()
+                partner_statuses.append(self.check_eligibility(partner, self.flooded.id).status_code)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        # Concurrent requests take tokens atomically: exactly one burst of the flood gets through
+        self.assertEqual(statuses.count(200), 10)
+        self.assertEqual(statuses.count(429), len(statuses) - 10)
+        # The other client keeps its whole burst, and its requests do not queue behind the flood
+        self.assertEqual(partner_statuses, [200] * 10 + [429])
+        self.assertLess(max(latencies), 0.5)
+
+    def test_client_id_header_needs_a_trusted_proxy(self):
+        statuses = [
+            self.check_eligibility(Client(HTTP_X_CLIENT_ID=f'client-{n}'), self.flooded.id).status_code
+            for n in range(11)
+        ]
+        self.assertEqual(statuses[-1], 429)
+
+        with override_settings(RATE_LIMIT_TRUST_CLIENT_ID=True):
+            self.assertEqual(self.check_eligibility(Client(HTTP_X_CLIENT_ID='partner'), self.flooded.id).status_code, 200)
+
+    def test_rate_limits_need_an_atomic_cache(self):
+        self.assertEqual(check_rate_limit_cache(None), [])
+        with override_settings(CACHES={'default': REDIS_CACHE, 'coordination': DATABASE_CACHE}):
+            self.assertEqual([error.id for error in check_rate_limit_cache(None)], ['core.E003'])
+
+    def test_malformed_customer_id_shares_one_bucket(self):
+        request = RequestFactory().post('/check-eligibility')
+        request.resolver_match = resolve('/check-eligibility')
+
+        self.assertEqual(bucket_for(request, '7')[0], 'core:rate:check-eligibility:7:127.0.0.1')
+        for customer_id in ['not an id', 'x' * 300, -1, 10 ** 30, None]:
+            self.assertEqual(bucket_for(request, customer_id)[0], 'core:rate:check-eligibility:*:127.0.0.1')
+
+
+@unittest.skipUnless(TEST_REDIS_URL, "Needs a Redis server at TEST_REDIS_URL, e.g. redis://localhost:6379/15")
+@override_settings(CACHES={'default': LOCAL_CACHE, 'coordination': {**REDIS_CACHE, 'LOCATION': TEST_REDIS_URL}})
+class RedisRateLimitTests(RateLimitTests):
+    """The rate limit tests against Redis, whose atomic incr production relies on."""
+
+
+class DecisionRuleTests(TestCase):
+    def setUp(self):
+        self.addCleanup(reload_rules)
+        self.addCleanup(DecisionRuleSet.objects.all().delete)
+
+    def publish(self, version, rules):
+        DecisionRuleSet.objects.update(is_active=False)
+        DecisionRuleSet.objects.create(version=version, rules=rules, is_active=True)
+        reload_rules()
+
+    def test_publish_retries_a_version_taken_concurrently(self):
+        DecisionRuleSet.objects.create(version=1, rules=DEFAULT_RULES, is_active=True)
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as f:
+            json.dump(DEFAULT_RULES, f)
+            f.flush()
+            # The first attempt reads the versions before another publish committed v1
+            with mock.patch.object(PublishRulesCommand, '_next_version', side_effect=[1, 2]):
+                call_command('publish_rules', f.name, stdout=io.StringIO())
+
+        self.assertEqual(
+            list(DecisionRuleSet.objects.order_by('version').values_list('version', 'is_active')),
+            [(1, False), (2, True)],
+        )
+
+    def test_default_rules_match_the_original_policy(self):
+        def original_score(aggregates, approved_limit):
+            if aggregates['active_debt'] > approved_limit:
+                return 0
+            total_loans = aggregates['total_loans']
+            score = (aggregates['on_time_loans'] / total_loans * 30) if total_loans else 0
+            score += min(total_loans, 10) * 2
+            score += min(aggregates['current_year_loans'], 5) * 3
+            score += min(aggregates['approved_volume'] / 1000000, 10) * 3
+            return min(100, math.floor(score))
+
+        def original_approval(credit_score, interest_rate):
+            if credit_score > 50:
+                return True, interest_rate
+            if credit_score > 30:
+                return interest_rate >= 12, max(interest_rate, 12.0)
+            if credit_score > 10:
+                return interest_rate >= 16, max(interest_rate, 16.0)
+            return False, None
+
+        rng = random.Random(0)
+        cases = []
+        for _ in range(2000):
+            total_loans = rng.randrange(0, 15)
+            aggregates = {
+                'total_loans': total_loans,
+                'on_time_loans': rng.randint(0, total_loans),
+                'current_year_loans': rng.randint(0, total_loans),
+                'approved_volume': rng.uniform(0, 15000000),
+                'active_debt': rng.uniform(0, 2000000),
+            }
+            cases.append((aggregates, rng.choice([1000000, 1500000]), rng.choice([8, 12, 14, 16, 17.5])))
+
+        scores = []
+        for aggregates, approved_limit, interest_rate in cases:
+            score = calculate_credit_score(aggregates, approved_limit)
+            self.assertEqual(score, original_score(aggregates, approved_limit))
+            self.assertEqual(approval_for_score(score, interest_rate), original_approval(score, interest_rate))
+            scores.append(score)
+
+        arrays = {field: np.array([case[0][field] for case in cases]) for field in cases[0][0]}
+        rates = np.array([case[2] for case in cases], dtype=float)
+        vector_scores = calculate_credit_scores(arrays, np.array([case[1] for case in cases]))
+        approvals, corrected = approval_for_scores(vector_scores, rates)
+        self.assertEqual(vector_scores.tolist(), scores)
+        for score, rate, approval, corrected_rate in zip(scores, rates, approvals, corrected):
+            expected_approval, expected_rate = original_approval(score, rate)
+            self.assertEqual(bool(approval), expected_approval)
+            self.assertEqual(None if np.isnan(corrected_rate) else corrected_rate, expected_rate)
+
+    def test_numeric_fields_are_validated(self):
+        fields = [
+            ('on_time_loans', 'weight'),
+            ('total_loans', 'weight'),
+            ('total_loans', 'cap'),
+            ('current_year_loans', 'weight'),
+            ('current_year_loans', 'cap'),
+            ('approved_volume', 'weight'),
+            ('approved_volume', 'cap'),
+            ('approved_volume', 'unit'),
+            ('max_score',),
+            ('rate_bands', 1, 'above'),
+            ('rate_bands', 1, 'min_rate'),
+        ]
+        for path in fields:
+            name = path[0] + ''.join(f'[{key}]' if isinstance(key, int) else f'.{key}' for key in path[1:])
+            # A null min_rate is valid: the band has no minimum rate
+            for value in ['two', math.nan, math.inf, -1, [2], *([None] if path[-1] != 'min_rate' else [])]:
+                with self.subTest(field=name, value=value):
+                    rules = copy.deepcopy(DEFAULT_RULES)
+                    parent = rules
+                    for key in path[:-1]:
+                        parent = parent[key]
+                    parent[path[-1]] = value
+                    with self.assertRaisesRegex(ValueError, re.escape(name)):
+                        compile_rules(1, rules)
+
+    def test_other_malformed_rules(self):
+        for change, field in [
+            (lambda rules: rules['approved_volume'].update(unit=0), 'approved_volume.unit'),
+            (lambda rules: rules.update(max_score=99.5), 'max_score'),
+            (lambda rules: rules['total_loans'].pop('cap'), 'total_loans.cap'),
+            (lambda rules: rules.pop('current_year_loans'), 'current_year_loans.weight'),
+            (lambda rules: rules.update(rate_bands={'above': 50}), 'rate_bands'),
+            (lambda rules: rules['rate_bands'].append('x'), 'rate_bands[3].above'),
+        ]:
+            with self.subTest(field=field):
+                rules = copy.deepcopy(DEFAULT_RULES)
+                change(rules)
+                with self.assertRaisesRegex(ValueError, re.escape(field)):
+                    compile_rules(1, rules)
+
+    def test_numeric_strings_are_coerced(self):
+        rules = copy.deepcopy(DEFAULT_RULES)
+        rules['total_loans']['weight'] = "2"
+        rules['max_score'] = "100"
+        aggregates = {
+            'total_loans': 4, 'on_time_loans': 3, 'current_year_loans': 1,
+            'approved_volume': 2500000, 'active_debt': 0,
+        }
+        self.assertEqual(
+            compile_rules(1, rules).credit_score(aggregates, 1000000),
+            DEFAULT_COMPILED.credit_score(aggregates, 1000000),
+        )
+
+    def test_new_version_is_picked_up_and_recorded(self):
+        customer = create_customer()
+        create_closed_loans(customer, 2)
+        offer = {'customer_id': customer.id, 'loan_amount': 100000, 'interest_rate': 11, 'tenure': 12}
+
+        response = self.client.post('/check-eligibility', offer, content_type='application/json').json()
+        self.assertEqual((response['approval'], response['rule_version']), (False, 0))
+
+        rules = copy.deepcopy(DEFAULT_RULES)
+        rules['rate_bands'][1]['min_rate'] = 10
+        self.publish(1, rules)
+
+        response = self.client.post('/check-eligibility', offer, content_type='application/json').json()
+        self.assertEqual((response['approval'], response['rule_version']), (True, 1))
+
+        response = self.client.post('/create-loan', offer, content_type='application/json').json()
+        self.assertEqual(response['rule_version'], 1)
+        self.assertEqual(Loan.objects.get(id=response['loan_id']).rule_version, 1)
+
+    def test_malformed_version_keeps_the_loaded_rules(self):
+        self.publish(1, DEFAULT_RULES)
+
+        with self.assertLogs('core.rules', 'ERROR'):
+            self.publish(2, {'rate_bands': []})
+        self.assertEqual(active_rules().version, 1)
+
+
+class DecisionReplayTests(TestCase):
+    def test_baseline_reproduces_the_view_and_candidate_changes_are_counted(self):
+        # One, two and three closed loans score 35, 40 and 45: all in the 12% band
+        for n in range(3):
+            create_closed_loans(create_customer(phone_number=9000000000 + n), n + 1)
+
+        with tempfile.NamedTemporaryFile('w+', suffix='.jsonl') as log:
+            for customer in Customer.objects.all():
+                for interest_rate in (8, 11, 14):
+                    body = {'customer_id': customer.id, 'loan_amount': 100000, 'interest_rate': interest_rate, 'tenure': 12}
+                    response = self.client.post('/check-eligibility', body, content_type='application/json').json()
+                    log.write(json.dumps({'endpoint': 'check-eligibility', 'request': body, 'response': response}) + '\n')
+            log.write(json.dumps({'endpoint': 'create-loan', 'request': {**body, 'customer_id': 999999}}) + '\n')
+            log.flush()
+
+            candidate = copy.deepcopy(DEFAULT_RULES)
+            candidate['rate_bands'][1]['min_rate'] = 10
+            rows = list(replay_log(read_log(log.name), (0, DEFAULT_RULES), (None, candidate)))
+
+        summary = summarize(rows, 1)
+        self.assertEqual((summary['recorded_checked'], summary['recorded_mismatches']), (9, 0))
+        self.assertEqual(summary['rejected'], {'404': 1})
+        self.assertEqual(summary['changed'], {'approval': 3, 'corrected_interest_rate': 6, 'monthly_installment': 0})
+        self.assertEqual(summary['approval_flips'], {'approved_to_declined': 0, 'declined_to_approved': 3})
+        self.assertEqual(Loan.objects.count(), 6)
+
+    @override_settings(RATE_LIMITS={})
+    def test_create_loan_over_the_debt_limit_has_no_installment(self):
+        customer = create_customer()
+        Loan.objects.create(
+            customer=customer,
+            loan_amount=1500000,
+            tenure=12,
+            interest_rate=10,
+            monthly_installment=131873.8,
+            emis_paid_on_time=True,
+            start_date=date.today(),
+            end_date=date.today() + relativedelta(months=12),
+        )
+        body = {'customer_id': customer.id, 'loan_amount': 100000, 'interest_rate': 14, 'tenure': 12}
+        response = self.client.post('/create-loan', body, content_type='application/json').json()
+        self.assertEqual((response['loan_approved'], response['monthly_installment']), (False, None))
+
+        with tempfile.NamedTemporaryFile('w+', suffix='.jsonl') as log:
+            log.write(json.dumps({'endpoint': 'create-loan', 'request': body, 'response': response}) + '\n')
+            log.flush()
+            [row] = replay_log(read_log(log.name), (0, DEFAULT_RULES), (0, DEFAULT_RULES))
+
+        self.assertEqual(row['recorded_mismatch'], [])
+        self.assertEqual((row['baseline']['approval'], row['baseline']['monthly_installment']), (False, None))
+
+    def write_log(self, log, lines):
+        log.write('\n'.join(lines) + '\n')
+        log.flush()
+
+    def test_malformed_lines_are_skipped_with_their_numbers(self):
+        customer = create_customer()
+        body = {'customer_id': customer.id, 'loan_amount': 100000, 'interest_rate': 14, 'tenure': 12}
+        valid = json.dumps({'endpoint': 'check-eligibility', 'request': body})
+
+        with tempfile.NamedTemporaryFile('w+', suffix='.jsonl') as log:
+            self.write_log(log, [
+                valid,
+                '{"endpoint": "check-eligibility", "request": ',
+                '',
+                '["check-eligibility"]',
+                json.dumps({'endpoint': 'check-eligibility', 'request': 'customer 1'}),
+                json.dumps({'endpoint': 'check-eligibility', 'request': body, 'response': [200]}),
+                json.dumps({'endpoint': 'check-eligibility', 'request': {**body, 'customer_id': 'one'}}),
+                valid,
+            ])
+            malformed = []
+            entries = list(read_log(log.name, malformed))
+
+            stdout, stderr = io.StringIO(), io.StringIO()
+            call_command('replay_decisions', log.name, '--baseline', '0', '--workers', '1', stdout=stdout, stderr=stderr)
+
+        self.assertEqual([number for number, _ in entries], [1, 8])
+        self.assertEqual([number for number, _ in malformed], [2, 4, 5, 6, 7])
+        self.assertTrue(malformed[0][1].startswith('invalid JSON'))
+        self.assertEqual([reason for _, reason in malformed[1:]], [
+            "expected a JSON object",
+            "request must be a JSON object",
+            "response must be a JSON object",
+            "request.customer_id must be an integer, not 'one'",
+        ])
+
+        report = json.loads(stdout.getvalue())
+        self.assertEqual((report['malformed_lines'], report['requests'], report['decided']), (5, 2, 2))
+        self.assertEqual(re.findall(r'Skipped malformed line (\d+)', stderr.getvalue()), ['2', '4', '5', '6', '7'])
+
+    def test_replay_errors_are_not_reported_as_malformed_lines(self):
+        customer = create_customer()
+        body = {'customer_id': customer.id, 'loan_amount': 100000, 'interest_rate': 14, 'tenure': 12}
+
+        with tempfile.NamedTemporaryFile('w+', suffix='.jsonl') as log:
+            self.write_log(log, [json.dumps({'endpoint': 'check-eligibility', 'request': body})])
+            with mock.patch('core.replay.eligibility_result', side_effect=ValueError("scoring failed")):
+                with self.assertRaisesMessage(ValueError, "scoring failed"):
+                    call_command('replay_decisions', log.name, '--baseline', '0', '--workers', '1', stdout=io.StringIO())
@@ -1,12 +1,19 @@
 from django.urls import path
 from core.views import RegisterCustomerView
-from .views import RegisterCustomerView, CheckEligibilityView, CreateLoanView, ViewLoanDetail, ViewCustomerLoansView
+from .views import RegisterCustomerView, RegisterCustomerBatchView, CheckEligibilityView, CheckEligibilityBatchView, LoanQuoteView, CreateLoanView, ViewLoanDetail, ViewLoanScheduleView, ViewCustomerLoansView, CacheStatsView, PortfolioSnapshotView, metrics_view
 
 
 urlpatterns = [
     path('register', RegisterCustomerView.as_view(), name='register'),
-    path('check-eligibility', CheckEligibilityView.as_view()),
-    path('create-loan', CreateLoanView.as_view()),
+    path('register/batch', RegisterCustomerBatchView.as_view(), name='register-batch'),
+    path('check-eligibility', CheckEligibilityView.as_view(), name='check-eligibility'),
+    path('check-eligibility/batch', CheckEligibilityBatchView.as_view(), name='check-eligibility-batch'),
+    path('loan-quote', LoanQuoteView.as_view(), name='loan-quote'),
+    path('create-loan', CreateLoanView.as_view(), name='create-loan'),
     path('view-loan/<int:loan_id>', ViewLoanDetail.as_view(), name='view-loan'),
+    path('view-loan/<int:loan_id>/schedule', ViewLoanScheduleView.as_view(), name='view-loan-schedule'),
     path('view-loans/<int:customer_id>', ViewCustomerLoansView.as_view(), name='view-loans'),
+    path('portfolio-snapshot', PortfolioSnapshotView.as_view(), name='portfolio-snapshot'),
+    path('cache-stats', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -0,0 +1,17 @@
+"""core.urls with the read-heavy endpoints served by async views, for ASGI deployments."""
+from django.urls import path
+
+from .async_views import AsyncCheckEligibilityView, AsyncViewCustomerLoansView, AsyncViewLoanDetail
+from .urls import urlpatterns as sync_urlpatterns
+
+ASYNC_VIEWS = {
+    'check-eligibility': AsyncCheckEligibilityView,
+    'view-loan': AsyncViewLoanDetail,
+    'view-loans': AsyncViewCustomerLoansView,
+}
+
+urlpatterns = [
+    path(str(pattern.pattern), ASYNC_VIEWS[pattern.name].as_view(), name=pattern.name)
+    if pattern.name in ASYNC_VIEWS else pattern
+    for pattern in sync_urlpatterns
+]
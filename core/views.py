@@ -2,14 +2,56 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
-from .models import Customer, Loan
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from .amortization import schedule_rows
+from .caching import (
+    CUSTOMER_LOANS_KEY,
+    LOAN_DETAIL_KEY,
+    cache_stats,
+    get_or_build,
+    timeout_until_midnight,
+)
+from .idempotency import idempotent
+from .metrics import render_prometheus
+from .models import Customer, CustomerCreditProfile, Loan, LoanArchive, PortfolioSnapshot
+from .outbox import publish
+from .registration import customer_data, register_customers
+from .renderers import FirstRendererNegotiation, ORJSONRenderer
+from .routers import replica_reads
+from .rules import active_rules
+from .scoring import (
+    approval_for_score,
+    approval_for_scores,
+    calculate_credit_score,
+    calculate_credit_scores,
+    calculate_emi,
+    calculate_emis,
+    emi_factor,
+    exceeds_emi_limit,
+    get_credit_profile,
+    get_credit_profiles,
+    max_affordable_amount,
+    record_new_loan,
+)
 from rest_framework import status
-from datetime import datetime
-import math
+from datetime import date, datetime
+import json
+from dateutil.relativedelta import relativedelta
+import numpy as np
+import orjson
+
+
+class HotPathAPIView(APIView):
+    """APIView that always renders with orjson, skipping Accept negotiation and the browsable API."""
+
+    renderer_classes = [ORJSONRenderer]
+    content_negotiation_class = FirstRendererNegotiation
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterCustomerView(APIView):
+    @idempotent('register')
     def post(self, request):
         data = request.data
 
@@ -45,23 +87,84 @@ class RegisterCustomerView(APIView):
                     current_debt=0
                 )
 
-            return Response({
-                "customer_id": customer.id,
-                "name": f"{customer.first_name} {customer.last_name}",
-                "age": customer.age,
-                "monthly_income": customer.monthly_salary,
-                "approved_limit": customer.approved_limit,
-                "phone_number": customer.phone_number
-            }, status=201)
+            return Response(customer_data(customer), status=201)
 
         except Exception as e:
             return Response({"error": str(e)}, status=500)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CheckEligibilityView(APIView):
+class RegisterCustomerBatchView(APIView):
+    max_batch_size = 50000
+
+    def post(self, request):
+        data = request.data
+
+        if not isinstance(data, list):
+            return Response({"error": "Expected a list of customers."}, status=400)
+        if len(data) > self.max_batch_size:
+            return Response({"error": f"At most {self.max_batch_size} customers per batch."}, status=400)
+
+        try:
+            results = register_customers(data)
+        except IntegrityError:
+            return Response({"error": "Phone numbers were registered concurrently; retry the batch."}, status=409)
+
+        return Response(results, status=200)
+
+
+def customer_with_aggregates(customer_id):
+    """Return ``(customer, aggregates)`` from one read of the customer and their profile.
+
+    Both are ``None`` when the customer does not exist.
+    """
+    customer = Customer.objects.select_related('credit_profile').filter(id=customer_id).first()
+    if customer is None:
+        return None, None
+    return customer, get_credit_profiles([customer])[customer.id].as_aggregates()
+
+
+def eligibility_result(customer, aggregates, loan_amount, interest_rate, tenure, rules):
+    """Return ``(data, status)`` for a check-eligibility request decided under ``rules``."""
+    credit_score = calculate_credit_score(aggregates, customer.approved_limit, rules)
+
+    try:
+        emi = calculate_emi(loan_amount, interest_rate, tenure)
+    except Exception:
+        return {"error": "Invalid loan or interest values."}, 400
+
+    total_emis = aggregates['active_emis'] + emi
+
+    if exceeds_emi_limit(total_emis, customer.monthly_salary):
+        return {
+            "customer_id": customer.id,
+            "approval": False,
+            "interest_rate": float(interest_rate),
+            "corrected_interest_rate": None,
+            "tenure": tenure,
+            "monthly_installment": round(emi, 2),
+            "rule_version": rules.version
+        }, 200
+
+    approval, corrected_interest_rate = approval_for_score(credit_score, interest_rate, rules)
+
+    return {
+        "customer_id": customer.id,
+        "approval": approval,
+        "interest_rate": float(interest_rate),
+        "corrected_interest_rate": corrected_interest_rate,
+        "tenure": tenure,
+        "monthly_installment": round(emi, 2),
+        "rule_version": rules.version
+    }, 200
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CheckEligibilityView(HotPathAPIView):
     def post(self, request):
         data = request.data
+        if not isinstance(data, dict):
+            return Response({"error": "Expected a JSON object."}, status=400)
 
         customer_id = data.get('customer_id')
         loan_amount = data.get('loan_amount')
@@ -71,83 +174,183 @@ class CheckEligibilityView(APIView):
         if not all([customer_id, loan_amount, interest_rate, tenure]):
             return Response({"error": "All fields are required."}, status=400)
 
-        try:
-            customer = Customer.objects.get(id=customer_id)
-        except Customer.DoesNotExist:
+        with replica_reads(customer_id):
+            customer, aggregates = customer_with_aggregates(customer_id)
+        if customer is None:
             return Response({"error": "Customer not found."}, status=404)
 
-        customer_loans = Loan.objects.filter(customer=customer)
-        current_year = datetime.now().year
-        today = datetime.now().date()
-
-        current_debt = sum(
-            loan.loan_amount for loan in customer_loans if loan.end_date >= today
+        result, status_code = eligibility_result(
+            customer, aggregates, loan_amount, interest_rate, tenure, active_rules()
         )
+        return Response(result, status=status_code)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CheckEligibilityBatchView(HotPathAPIView):
+    """check-eligibility for a list of requests, answering each one as the single endpoint would.
+
+    As in the single endpoint, an unknown customer is a 404 even when the loan values
+    are invalid too; only a ``customer_id`` that is not an integer is rejected first.
+    """
+
+    max_batch_size = 10000
+
+    def post(self, request):
+        data = request.data
+
+        if not isinstance(data, list):
+            return Response({"error": "Expected a list of eligibility requests."}, status=400)
+        if len(data) > self.max_batch_size:
+            return Response({"error": f"At most {self.max_batch_size} requests per batch."}, status=400)
+
+        results = [None] * len(data)
+        pending = []
+
+        for index, item in enumerate(data):
+            if not isinstance(item, dict):
+                results[index] = {"error": "All fields are required.", "status": 400}
+                continue
+
+            fields = [item.get(key) for key in ('customer_id', 'loan_amount', 'interest_rate', 'tenure')]
+            if not all(fields):
+                results[index] = {"error": "All fields are required.", "status": 400}
+                continue
+
+            try:
+                customer_id = int(fields[0])
+            except (TypeError, ValueError):
+                results[index] = {"error": "Invalid loan or interest values.", "status": 400}
+                continue
+
+            try:
+                loan_amount, interest_rate = float(fields[1]), float(fields[2])
+                tenure = int(fields[3])
+            except (TypeError, ValueError):
+                # Reported once the customer is known to exist
+                loan_amount = interest_rate = tenure = None
+
+            pending.append((index, customer_id, loan_amount, interest_rate, tenure, item['tenure']))
+
+        customer_ids = {entry[1] for entry in pending}
+        with replica_reads(*customer_ids):
+            customers = Customer.objects.filter(id__in=customer_ids).select_related('credit_profile')
+            customers = {customer.id: customer for customer in customers}
+            profiles = get_credit_profiles(customers.values())
+
+        found = []
+        for entry in pending:
+            if entry[1] not in customers:
+                results[entry[0]] = {"error": "Customer not found.", "status": 404}
+            elif entry[2] is None:
+                results[entry[0]] = {"error": "Invalid loan or interest values.", "status": 400}
+            else:
+                found.append(entry)
+
+        if found:
+            customer_ids = [entry[1] for entry in found]
+            loan_amounts = np.array([entry[2] for entry in found])
+            interest_rates = np.array([entry[3] for entry in found])
+            tenures = np.array([entry[4] for entry in found])
+            aggregates = {
+                field: np.array([getattr(profiles[customer_id], field) for customer_id in customer_ids])
+                for field in CustomerCreditProfile.SCORE_FIELDS
+            }
+            approved_limits = np.array([customers[customer_id].approved_limit for customer_id in customer_ids])
+            salaries = np.array([customers[customer_id].monthly_salary for customer_id in customer_ids])
+
+            rules = active_rules()
+            credit_scores = calculate_credit_scores(aggregates, approved_limits, rules)
+            emis = calculate_emis(loan_amounts, interest_rates, tenures)
+            over_limit = exceeds_emi_limit(aggregates['active_emis'] + emis, salaries)
+            approvals, corrected_rates = approval_for_scores(credit_scores, interest_rates, rules)
+            approvals &= ~over_limit
+            corrected_rates[over_limit] = np.nan
+
+            for position, entry in enumerate(found):
+                emi = emis[position]
+                if not np.isfinite(emi):
+                    results[entry[0]] = {"error": "Invalid loan or interest values.", "status": 400}
+                    continue
+
+                corrected = corrected_rates[position]
+                results[entry[0]] = {
+                    "customer_id": entry[1],
+                    "approval": bool(approvals[position]),
+                    "interest_rate": entry[3],
+                    "corrected_interest_rate": None if np.isnan(corrected) else float(corrected),
+                    "tenure": entry[5],
+                    "monthly_installment": round(float(emi), 2),
+                    "rule_version": rules.version
+                }
+
+        return Response(results, status=200)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class LoanQuoteView(HotPathAPIView):
+    standard_tenures = (6, 12, 18, 24, 36, 48, 60, 72, 84, 96, 120)
+
+    def post(self, request):
+        data = request.data
+
+        customer_id = data.get('customer_id')
+        interest_rate = data.get('interest_rate')
+        tenures = data.get('tenures') or self.standard_tenures
 
-        if current_debt > customer.approved_limit:
-            credit_score = 0
-        else:
-            on_time_loan_count = sum(1 for loan in customer_loans if loan.emis_paid_on_time)
-            total_loans = customer_loans.count()
-            current_year_loans = sum(1 for loan in customer_loans if loan.start_date.year == current_year)
-            approved_volume = sum(loan.loan_amount for loan in customer_loans)
-
-            score = 0
-            score += (on_time_loan_count / total_loans * 30) if total_loans else 0
-            score += min(total_loans, 10) * 2
-            score += min(current_year_loans, 5) * 3
-            score += min(approved_volume / 1000000, 10) * 3
-            credit_score = min(100, math.floor(score))
+        if not all([customer_id, interest_rate]):
+            return Response({"error": "customer_id and interest_rate are required."}, status=400)
+
+        # One quote per tenure, so no more of them than the standard set
+        if (
+            not isinstance(tenures, (list, tuple))
+            or len(tenures) > len(self.standard_tenures)
+            or not all(type(tenure) is int for tenure in tenures)
+        ):
+            return Response({
+                "error": f"tenures must be a list of at most {len(self.standard_tenures)} whole numbers."
+            }, status=400)
 
         try:
-            r = float(interest_rate) / (12 * 100)
-            emi = (
-                float(loan_amount) * r * (1 + r) ** int(tenure)
-            ) / ((1 + r) ** int(tenure) - 1)
+            interest_rate = float(interest_rate)
+            for tenure in tenures:
+                emi_factor(interest_rate, tenure)
         except Exception:
-            return Response({"error": "Invalid loan or interest values."}, status=400)
+            return Response({"error": "Invalid interest rate or tenures."}, status=400)
 
-        total_emis = sum(
-            loan.monthly_installment for loan in customer_loans if loan.end_date >= today
-        ) + emi
+        with replica_reads(customer_id):
+            customer, aggregates = customer_with_aggregates(customer_id)
+        if customer is None:
+            return Response({"error": "Customer not found."}, status=404)
 
-        if total_emis > 0.5 * customer.monthly_salary:
-            return Response({
-                "customer_id": customer.id,
-                "approval": False,
-                "interest_rate": float(interest_rate),
-                "corrected_interest_rate": None,
+        rules = active_rules()
+        credit_score = calculate_credit_score(aggregates, customer.approved_limit, rules)
+        approval, corrected_interest_rate = approval_for_score(credit_score, interest_rate, rules)
+
+        # check-eligibility rejects once active EMIs plus the new one pass half the salary
+        emi_headroom = 0.5 * customer.monthly_salary - aggregates['active_emis'] if approval else 0
+
+        quotes = []
+        for tenure in tenures:
+            max_loan_amount = max_affordable_amount(emi_headroom, interest_rate, tenure)
+            quotes.append({
                 "tenure": tenure,
-                "monthly_installment": round(emi, 2)
-            }, status=200)
-
-        corrected_interest_rate = float(interest_rate)
-        approval = False
-
-        if credit_score > 50:
-            approval = True
-        elif 50 >= credit_score > 30:
-            approval = float(interest_rate) >= 12
-            corrected_interest_rate = max(float(interest_rate), 12.0)
-        elif 30 >= credit_score > 10:
-            approval = float(interest_rate) >= 16
-            corrected_interest_rate = max(float(interest_rate), 16.0)
-        else:
-            approval = False
-            corrected_interest_rate = None
+                "max_loan_amount": max_loan_amount,
+                "monthly_installment": round(calculate_emi(max_loan_amount, interest_rate, tenure), 2)
+            })
 
         return Response({
             "customer_id": customer.id,
-            "approval": approval,
-            "interest_rate": float(interest_rate),
+            "approval": approval and emi_headroom > 0,
+            "interest_rate": interest_rate,
             "corrected_interest_rate": corrected_interest_rate,
-            "tenure": tenure,
-            "monthly_installment": round(emi, 2)
+            "quotes": quotes,
+            "rule_version": rules.version
         }, status=200)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
 class CreateLoanView(APIView):
+    @idempotent('create-loan')
     def post(self, request):
         data = request.data
 
@@ -159,160 +362,316 @@ class CreateLoanView(APIView):
         if not all([customer_id, loan_amount, interest_rate, tenure]):
             return Response({"error": "All fields are required."}, status=400)
 
+        # EMI Calculation, kept outside the customer lock
         try:
-            customer = Customer.objects.get(id=customer_id)
-        except Customer.DoesNotExist:
-            return Response({"error": "Customer not found."}, status=404)
-
-        # Fetch past loans
-        customer_loans = Loan.objects.filter(customer=customer)
-        current_year = datetime.now().year
-        today = datetime.now().date()
-
-        current_debt = sum(
-            loan.loan_amount for loan in customer_loans if loan.end_date >= today
-        )
-
-        if current_debt > customer.approved_limit:
-            return Response({
-                "loan_id": None,
-                "customer_id": customer.id,
-                "loan_approved": False,
-                "message": "Current debt exceeds approved limit.",
-                "monthly_installment": None
-            }, status=200)
-
-        # Credit score calculation
-        on_time_loan_count = sum(1 for loan in customer_loans if loan.emis_paid_on_time)
-        total_loans = customer_loans.count()
-        current_year_loans = sum(1 for loan in customer_loans if loan.start_date.year == current_year)
-        approved_volume = sum(loan.loan_amount for loan in customer_loans)
-
-        score = 0
-        score += (on_time_loan_count / total_loans * 30) if total_loans else 0
-        score += min(total_loans, 10) * 2
-        score += min(current_year_loans, 5) * 3
-        score += min(approved_volume / 1000000, 10) * 3
-        credit_score = min(100, math.floor(score))
-
-        # EMI Calculation
-        try:
-            r = float(interest_rate) / (12 * 100)
-            emi = (
-                float(loan_amount) * r * (1 + r) ** int(tenure)
-            ) / ((1 + r) ** int(tenure) - 1)
+            emi = calculate_emi(loan_amount, interest_rate, tenure)
         except Exception:
-            return Response({"error": "Invalid loan or interest values."}, status=400)
+            emi = None
+        rules = active_rules()
 
-        total_emis = sum(
-            loan.monthly_installment for loan in customer_loans if loan.end_date >= today
-        ) + emi
-
-        if total_emis > 0.5 * customer.monthly_salary:
-            return Response({
-                "loan_id": None,
-                "customer_id": customer.id,
-                "loan_approved": False,
-                "message": "Total EMI exceeds 50% of monthly salary.",
-                "monthly_installment": round(emi, 2)
-            }, status=200)
-
-        # Determine approval based on credit score
-        approval = False
-        corrected_interest_rate = float(interest_rate)
-
-        if credit_score > 50:
-            approval = True
-        elif 50 >= credit_score > 30:
-            approval = float(interest_rate) >= 12
-            corrected_interest_rate = max(float(interest_rate), 12.0)
-        elif 30 >= credit_score > 10:
-            approval = float(interest_rate) >= 16
-            corrected_interest_rate = max(float(interest_rate), 16.0)
-        else:
-            approval = False
-
-        if not approval:
-            return Response({
-                "loan_id": None,
-                "customer_id": customer.id,
-                "loan_approved": False,
-                "message": "Loan cannot be approved based on credit score or interest rate.",
-                "monthly_installment": round(emi, 2)
-            }, status=200)
-
-        # Create loan
         with transaction.atomic():
+            # Concurrent requests for one customer queue here, so limit checks see every earlier loan
+            try:
+                customer = Customer.objects.select_for_update().get(id=customer_id)
+            except Customer.DoesNotExist:
+                return Response({"error": "Customer not found."}, status=404)
+
+            today = datetime.now().date()
+            profile = get_credit_profile(customer.id, today)
+            aggregates = profile.as_aggregates()
+
+            if aggregates['active_debt'] > customer.approved_limit:
+                return Response({
+                    "loan_id": None,
+                    "customer_id": customer.id,
+                    "loan_approved": False,
+                    "message": "Current debt exceeds approved limit.",
+                    "monthly_installment": None,
+                    "rule_version": rules.version
+                }, status=200)
+
+            # Credit score calculation
+            credit_score = calculate_credit_score(aggregates, customer.approved_limit, rules)
+
+            if emi is None:
+                return Response({"error": "Invalid loan or interest values."}, status=400)
+
+            total_emis = aggregates['active_emis'] + emi
+
+            if exceeds_emi_limit(total_emis, customer.monthly_salary):
+                return Response({
+                    "loan_id": None,
+                    "customer_id": customer.id,
+                    "loan_approved": False,
+                    "message": "Total EMI exceeds 50% of monthly salary.",
+                    "monthly_installment": round(emi, 2),
+                    "rule_version": rules.version
+                }, status=200)
+
+            # Determine approval based on credit score
+            approval, corrected_interest_rate = approval_for_score(credit_score, interest_rate, rules)
+
+            if not approval:
+                return Response({
+                    "loan_id": None,
+                    "customer_id": customer.id,
+                    "loan_approved": False,
+                    "message": "Loan cannot be approved based on credit score or interest rate.",
+                    "monthly_installment": round(emi, 2),
+                    "rule_version": rules.version
+                }, status=200)
+
+            # Create loan
             loan = Loan.objects.create(
                 customer=customer,
-                loan_amount=loan_amount,
+                loan_amount=float(loan_amount),
                 interest_rate=corrected_interest_rate,
-                tenure=tenure,
+                tenure=int(tenure),
                 monthly_installment=emi,
                 emis_paid_on_time=True,  # default assumption
                 start_date=today,
-                end_date=datetime(today.year + tenure // 12, today.month, today.day)
+                end_date=today + relativedelta(months=int(tenure)),
+                rule_version=rules.version
             )
-
-            # Update current debt
-            customer.current_debt += float(loan_amount)
-            customer.save()
+            # The next limit check reads the profile, so it is updated here; the
+            # loan.created handler brings current_debt and the caches up to date
+            record_new_loan(profile, loan, today)
+            publish('loan.created', loan_id=loan.id, customer_id=customer.id)
 
         return Response({
             "loan_id": loan.id,
             "customer_id": customer.id,
             "loan_approved": True,
             "message": "Loan approved successfully.",
-            "monthly_installment": round(emi, 2)
+            "monthly_installment": round(emi, 2),
+            "rule_version": rules.version
         }, status=201)
 
 
-class ViewLoanDetail(APIView):
+def loan_detail(loan):
+    customer = loan.customer
+
+    return {
+        "loan_id": loan.id,
+        "customer": {
+            "id": customer.id,
+            "first_name": customer.first_name,
+            "last_name": customer.last_name,
+            "phone_number": customer.phone_number,
+            "age": customer.age
+        },
+        "loan_amount": loan.loan_amount,
+        "interest_rate": loan.interest_rate,
+        "loan_approved": True,
+        "monthly_installment": round(loan.monthly_installment, 2),
+        "tenure": loan.tenure
+    }
+
+
+class ViewLoanDetail(HotPathAPIView):
     def get(self, request, loan_id):
-        try:
-            loan = Loan.objects.select_related('customer').get(id=loan_id)
-        except Loan.DoesNotExist:
+        with replica_reads():
+            loan_data = get_or_build(
+                LOAN_DETAIL_KEY.format(loan_id), lambda: self.build_loan_data(loan_id)
+            )
+        if loan_data is None:
+            # A loan created moments ago may not have reached the replica yet
+            loan_data = get_or_build(
+                LOAN_DETAIL_KEY.format(loan_id), lambda: self.build_loan_data(loan_id)
+            )
+        if loan_data is None:
             return Response({"error": "Loan not found."}, status=404)
 
-        customer = loan.customer
+        return Response(loan_data, status=200)
+
+    @staticmethod
+    def build_loan_data(loan_id):
+        # Matured loans move to the archive under the same id
+        for model in (Loan, LoanArchive):
+            loan = model.objects.select_related('customer').filter(id=loan_id).first()
+            if loan is not None:
+                return loan_detail(loan)
+        return None
 
-        return Response({
+
+class ViewLoanScheduleView(APIView):
+    def get(self, request, loan_id):
+        with replica_reads():
+            loan = self.find_loan(loan_id)
+        if loan is None:
+            # Fall back to the primary for loans the replica has not caught up with
+            loan = self.find_loan(loan_id)
+        if loan is None:
+            return Response({"error": "Loan not found."}, status=404)
+
+        try:
+            first_month = int(request.query_params.get('from', 1))
+            last_month = int(request.query_params.get('to', loan.tenure))
+        except ValueError:
+            return Response({"error": "from and to must be integers."}, status=400)
+
+        if not 1 <= first_month <= last_month <= loan.tenure:
+            return Response({"error": f"Expected 1 <= from <= to <= {loan.tenure}."}, status=400)
+
+        header = json.dumps({
             "loan_id": loan.id,
-            "customer": {
-                "id": customer.id,
-                "first_name": customer.first_name,
-                "last_name": customer.last_name,
-                "phone_number": customer.phone_number,
-                "age": customer.age
-            },
             "loan_amount": loan.loan_amount,
             "interest_rate": loan.interest_rate,
-            "loan_approved": True,
             "monthly_installment": round(loan.monthly_installment, 2),
             "tenure": loan.tenure
-        }, status=200)
+        })
+
+        def render():
+            yield header[:-1] + ', "schedule": ['
+            for index, row in enumerate(schedule_rows(loan, first_month, last_month)):
+                yield (',' if index else '') + json.dumps(row)
+            yield ']}'
+
+        return StreamingHttpResponse(render(), content_type='application/json')
+
+    @staticmethod
+    def find_loan(loan_id):
+        for model in (Loan, LoanArchive):
+            loan = model.objects.only(
+                'id', 'loan_amount', 'interest_rate', 'monthly_installment', 'tenure', 'start_date'
+            ).filter(id=loan_id).first()
+            if loan is not None:
+                return loan
+        return None
+
+
+def loan_summary(loan, today):
+    months_left = max(0, (loan.end_date.year - today.year) * 12 + (loan.end_date.month - today.month))
+    return {
+        "loan_id": loan.id,
+        "loan_amount": loan.loan_amount,
+        "interest_rate": loan.interest_rate,
+        "monthly_installment": round(loan.monthly_installment, 2),
+        "repayments_left": months_left
+    }
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ViewCustomerLoansView(APIView):
+class ViewCustomerLoansView(HotPathAPIView):
+    max_page_size = 1000
+    stream_chunk_size = 2000
+
     def get(self, request, customer_id):
+        with replica_reads(customer_id):
+            return self.read_loans(request.query_params, customer_id)
+
+    def read_loans(self, params, customer_id):
+        if params.get('stream') == 'true':
+            return self.stream_loans(customer_id)
+        if 'limit' in params or 'cursor' in params:
+            return self.paginate_loans(customer_id, params)
+
+        # repayments_left and the active-loan filter change when the date does
+        loan_data = get_or_build(
+            CUSTOMER_LOANS_KEY.format(customer_id),
+            lambda: self.build_loan_data(customer_id),
+            timeout=timeout_until_midnight(),
+        )
+        if loan_data is None:
+            return Response({"error": "Customer not found."}, status=404)
+
+        return Response(loan_data, status=200)
+
+    @staticmethod
+    def active_loans(customer_id, today):
+        return Loan.objects.filter(customer_id=customer_id, end_date__gte=today).only(
+            'id', 'loan_amount', 'interest_rate', 'monthly_installment', 'end_date'
+        ).order_by('id')
+
+    @classmethod
+    def build_loan_data(cls, customer_id):
+        if not Customer.objects.filter(id=customer_id).exists():
+            return None
+
+        today = datetime.now().date()
+        return [loan_summary(loan, today) for loan in cls.active_loans(customer_id, today)]
+
+    @classmethod
+    def page_params(cls, params):
+        """Return ``(limit, cursor)``; raises ``ValueError`` with a client-facing message."""
         try:
-            customer = Customer.objects.get(id=customer_id)
-        except Customer.DoesNotExist:
+            limit = min(int(params.get('limit', cls.max_page_size)), cls.max_page_size)
+            cursor = int(params.get('cursor', 0))
+        except ValueError:
+            raise ValueError("limit and cursor must be integers.")
+
+        if limit < 1:
+            raise ValueError("limit must be positive.")
+        return limit, cursor
+
+    def paginate_loans(self, customer_id, params):
+        try:
+            limit, cursor = self.page_params(params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        if not Customer.objects.filter(id=customer_id).exists():
             return Response({"error": "Customer not found."}, status=404)
 
         today = datetime.now().date()
-        loans = Loan.objects.filter(customer=customer, end_date__gte=today)
-
-        loan_data = []
-        for loan in loans:
-            months_left = max(0, (loan.end_date.year - today.year) * 12 + (loan.end_date.month - today.month))
-            loan_data.append({
-                "loan_id": loan.id,
-                "loan_amount": loan.loan_amount,
-                "interest_rate": loan.interest_rate,
-                "monthly_installment": round(loan.monthly_installment, 2),
-                "repayments_left": months_left
-            })
+        loans = list(self.active_loans(customer_id, today).filter(id__gt=cursor)[:limit + 1])
+        has_more = len(loans) > limit
+        loans = loans[:limit]
 
-        return Response(loan_data, status=200)
+        return Response({
+            "results": [loan_summary(loan, today) for loan in loans],
+            "next_cursor": loans[-1].id if has_more else None
+        }, status=200)
+
+    def stream_loans(self, customer_id):
+        if not Customer.objects.filter(id=customer_id).exists():
+            return Response({"error": "Customer not found."}, status=404)
+
+        today = datetime.now().date()
+        loans = self.active_loans(customer_id, today)
+        # The stream is consumed after the view returns, so fix the database now
+        loans = loans.using(loans.db).iterator(chunk_size=self.stream_chunk_size)
+
+        def render():
+            yield '['
+            for index, loan in enumerate(loans):
+                yield (b',' if index else b'') + orjson.dumps(loan_summary(loan, today))
+            yield ']'
+
+        return StreamingHttpResponse(render(), content_type='application/json')
+
+
+class PortfolioSnapshotView(APIView):
+    def get(self, request):
+        snapshots = PortfolioSnapshot.objects.order_by('-as_of')
+        as_of = request.query_params.get('date')
+        if as_of:
+            try:
+                snapshots = snapshots.filter(as_of=date.fromisoformat(as_of))
+            except ValueError:
+                return Response({"error": "date must be YYYY-MM-DD."}, status=400)
+
+        with replica_reads():
+            snapshot = snapshots.first()
+        if snapshot is None:
+            return Response({"error": "No portfolio snapshot available."}, status=404)
+
+        return Response({
+            "as_of": snapshot.as_of,
+            "customers": snapshot.customers,
+            "active_loans": snapshot.active_loans,
+            "outstanding_exposure": snapshot.outstanding_exposure,
+            "active_emis": snapshot.active_emis,
+            "customers_over_emi_limit": snapshot.customers_over_emi_limit,
+            "emi_to_salary": snapshot.emi_to_salary,
+            "score_bands": snapshot.score_bands
+        }, status=200)
+
+
+def metrics_view(request):
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4')
+
+
+class CacheStatsView(APIView):
+    def get(self, request):
+        return Response(cache_stats(), status=200)